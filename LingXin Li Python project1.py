@@ -16,8 +16,14 @@ any changes, are expressly prohibited.
 All of the files in this directory and all subdirectories are:
 Copyright (c) University of Toronto
 """
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
-from typing import Dict, Tuple, List, Set, Optional, TextIO
+from itertools import islice
+from typing import Dict, Iterable, Tuple, List, Set, Optional, TextIO
+
+from election_queries import ChangeLog, ElectionHistory, RankedResults
 
 # Constants that can be used throughout this module.
 # Column numbers where various values can be found in the csv files containing
@@ -26,30 +32,62 @@ RIDING = 1
 PARTY = 13
 VOTES = 17
 
+# The number of csv rows that read_results merges into an Election at a time.
+# Small batches keep the rows being merged in the processor cache.
+BATCH_ROWS = 4096
+
 
-class Election:
+class Election(RankedResults):
     """Data for a single election in a parliamentary democracy.
 
+    The rankings of the parties in each riding (see RankedResults) are kept
+    up to date as results are recorded.
+
     === Private Attributes ===
     _d: the date of this election.
     _ridings: all ridings for which any votes have been recorded in this
         election.
     _parties: all parties for which any votes have been recorded in this
         election.
+    _party_ids: the position of each party in _parties, so that membership
+        can be checked without searching the list.
     _results: the vote counts for this election.  Each key is the name of a
         riding, and its value is a dictionary of results for that one riding.
         Each of its keys, in turn, is the name of a party, and the associated
         value is the number of votes earned by that party in that riding.
             A party only appears in the dictionary for a riding if that party
         has had at least one vote recorded in that riding.
+    _ingest_stats: statistics about the most recent call to read_results.
+    _totals: the total number of votes recorded for each party across all
+        ridings, kept up to date by update_results.
+    _seats: the number of ridings won outright by each party, kept up to date
+        by update_results.
+    _leaders: the party or parties with the most votes in each riding, kept
+        up to date by update_results.
+    _rankings: the parties with votes in each riding, from most votes to
+        fewest, kept up to date by update_results.  Tied parties are in the
+        order they reached that number of votes (or, for votes read or
+        merged together, in the order they had before).
+    _changes: the version of this election, and the version in which each
+        riding's results and each party's popular vote or seats last changed.
+    _unranked: the ridings to rerank at the end of the read_results in
+        progress, or None to rerank them all, as it began with no results.
+    _cache: results of queries computed since the last call to
+        update_results.  Each key is the name of a method.
+    _cache_hits: the number of queries answered from _cache.
+    _cache_misses: the number of queries that had to be computed.
 
     === Representation Invariants ==
     - For all strings s, s in self._ridings iff s in self._results
     - For all strings s, s in self._parties iff s in self._results[r] for some r
+    - For all strings s in self._parties,
+      self._parties[self._party_ids[s]] == s
     - All recorded vote counts are greater than 0. That is,
       for every key (riding, results) in self._results,
           for every (party, votes) in results,
               votes > 0
+    - self._totals, self._seats, self._leaders and self._rankings agree with
+      self._results.
 
     === Sample Usage ===
     >>> e = Election(date(2000, 2, 8))
@@ -69,7 +107,18 @@ class Election:
     _d: date
     _ridings: List[str]
     _parties: List[str]
+    _party_ids: Dict[str, int]
     _results: Dict[str, Dict[str, int]]
+    _ingest_stats: Dict[str, float]
+    _totals: Dict[str, int]
+    _seats: Dict[str, int]
+    _leaders: Dict[str, List[str]]
+    _rankings: Dict[str, List[str]]
+    _changes: ChangeLog
+    _unranked: Optional[Dict[str, None]]
+    _cache: Dict[str, List[str]]
+    _cache_hits: int
+    _cache_misses: int
 
     def __init__(self, d: date) -> None:
         """Initialize a new election on date d and with no ridings, parties,
@@ -82,7 +131,19 @@ class Election:
         self._d = d
         self._ridings = []
         self._parties = []
+        self._party_ids = {}
         self._results = {}
+        self._ingest_stats = {'rows': 0, 'seconds': 0.0,
+                              'rows_per_second': 0.0}
+        self._totals = {}
+        self._seats = {}
+        self._leaders = {}
+        self._rankings = {}
+        self._changes = ChangeLog()
+        self._unranked = {}
+        self._cache = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
 
     def ridings_recorded(self) -> List[str]:
         """Return the ridings in which votes have been recorded in this
@@ -116,28 +177,326 @@ class Election:
         >>> e.results_for('r1', 'ndp')
         1001
         """
-        if party not in self._parties:
-            self._parties.append(party)
-        if riding not in self._results:
-            self._results[riding] = {}
-            self._ridings.append(riding)
-        if party not in self._results[riding]:
-            self._results[riding][party] = 0
-        self._results[riding][party] += votes
+        self._start_update()
+        if party not in self._party_ids:
+            self._add_party(party)
+        if riding not in self._leaders:
+            self._add_riding(riding)
+        leaders = self._leaders[riding]
+        max_value = 0
+        if len(leaders) > 0:
+            max_value = self.results_for(riding, leaders[0]) or 0
+        new_total = self._add_votes(riding, party, votes)
+        self._totals[party] += votes
+
+        # Votes only increase, so the party can only move up the ranking.
+        ranking = self._rankings[riding]
+        if new_total == votes:
+            ranking.append(party)
+        i = ranking.index(party)
+        while i > 0:
+            ahead = self.results_for(riding, ranking[i - 1])
+            if ahead is not None and ahead >= new_total:
+                break
+            ranking[i] = ranking[i - 1]
+            i -= 1
+        ranking[i] = party
+
+        changed = [party]
+        if new_total > max_value:
+            if len(leaders) == 1:
+                self._seats[leaders[0]] -= 1
+                changed.append(leaders[0])
+            self._leaders[riding] = [party]
+            self._seats[party] += 1
+        elif new_total == max_value and party not in leaders:
+            if len(leaders) == 1:
+                self._seats[leaders[0]] -= 1
+                changed.append(leaders[0])
+            leaders.append(party)
+        self._log_change(riding, changed)
+
+    def _start_update(self) -> None:
+        """Record that the results of this election are about to change, by
+        moving to its next version and emptying its cache.
+        """
+        self._changes.advance()
+        if len(self._cache) > 0:
+            self._cache.clear()
+
+    def _log_change(self, riding: Optional[str], parties: List[str]) -> None:
+        """Record that the results of <riding> (unless it is None), and the
+        popular vote or seats of <parties>, changed in the current version of
+        this election.
+        """
+        if riding is not None:
+            self._changes.log('riding', riding)
+        for party in parties:
+            self._changes.log('party', party)
+
+    def version(self) -> int:
+        """Return the current version of this election, which increases every
+        time its results change.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.version()
+        0
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.version()
+        1
+        """
+        return self._changes.version
+
+    def changes_since(self, version: int) -> dict:
+        """Return what has changed in this election since <version>.
+
+        The result maps 'version' to the current version, 'ridings' to the
+        results (as a dictionary from parties to votes) of every riding whose
+        results have changed since <version>, and 'popular_vote' and 'seats'
+        to the popular vote and seats of every party whose popular vote or
+        seats have changed since <version>.  If the election could not tell
+        which parties' seats changed (see ChangeLog), 'seats' holds the seats
+        of every party.  This takes time proportional to the number of changes.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 3)
+        >>> e.update_results('r2', 'lib', 2)
+        >>> v = e.version()
+        >>> e.update_results('r1', 'lib', 4)
+        >>> e.changes_since(v) == {'version': 3,
+        ...                        'ridings': {'r1': {'ndp': 3, 'lib': 4}},
+        ...                        'popular_vote': {'ndp': 3, 'lib': 6},
+        ...                        'seats': {'ndp': 0, 'lib': 2}}
+        True
+        >>> e.changes_since(e.version())['ridings']
+        {}
+        """
+        ridings = {}
+        parties = []
+        seats_changed = False
+        for kind, name in self._changes.since(version):
+            if kind == 'riding':
+                ridings[name] = dict(self._riding_results(name))
+            elif kind == 'party':
+                parties.append(name)
+            else:
+                seats_changed = True
+        popular_vote = self.popular_vote() if len(parties) > 0 else {}
+        seats = self.party_seats() if len(parties) > 0 or seats_changed else {}
+        if not seats_changed:
+            seats = {p: seats[p] for p in parties}
+        return {'version': self._changes.version,
+                'ridings': ridings,
+                'popular_vote': {p: popular_vote[p] for p in parties},
+                'seats': seats}
+
+    def _add_party(self, party: str) -> None:
+        """Record that <party> has votes in this election.
+
+        Precondition: <party> is not already recorded in this election.
+        """
+        self._party_ids[party] = len(self._parties)
+        self._parties.append(party)
+        self._totals[party] = 0
+        self._seats[party] = 0
+
+    def _add_riding(self, riding: str) -> None:
+        """Record that <riding> has votes in this election.
+
+        Precondition: <riding> is not already recorded in this election.
+        """
+        self._results[riding] = {}
+        self._ridings.append(riding)
+        self._leaders[riding] = []
+        self._rankings[riding] = []
+
+    def _add_votes(self, riding: str, party: str, votes: int) -> int:
+        """Add <votes> to the votes of <party> in <riding>, and return its new
+        number of votes in that riding.
+
+        Precondition: <riding> and <party> are already recorded in this
+        election.
+        """
+        party_data = self._results[riding]
+        new_total = party_data.get(party, 0) + votes
+        party_data[party] = new_total
+        return new_total
+
+    def _riding_results(self, riding: str) -> Dict[str, int]:
+        """Return the number of votes of each party with at least one vote in
+        <riding>.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        return self._results[riding]
 
     def read_results(self, input_stream: TextIO) -> None:
         """Update this election with the results in input_stream.
 
+        The file is read BATCH_ROWS rows at a time (see _merge_lines), so
+        memory use does not grow with its size, and each riding is reranked
+        once, at the end.  The number of rows read and the rate at which they
+        were read are available afterwards from ingest_stats.
+
         Precondition: input_stream is an open csv file, in the format defined
-        in the A0 handout.
+        in the A0 handout, with one row per line.
+
+        >>> from io import StringIO
+        >>> def row(riding, party, votes):
+        ...     cols = [''] * (VOTES + 1)
+        ...     cols[RIDING], cols[PARTY], cols[VOTES] = riding, party, votes
+        ...     return ','.join(cols) + '\\n'
+        >>> data = row('riding', 'party', 'votes') + \\
+        ...     row('"Toronto, Centre"', 'ndp', '10') + \\
+        ...     row('"Toronto, Centre"', 'lib', '20') + \\
+        ...     row('"Toronto, Centre"', 'ndp', '5')
+        >>> e = Election(date(2015, 10, 19))
+        >>> e.read_results(StringIO(data))
+        >>> e.results_for('Toronto, Centre', 'ndp')
+        15
+        >>> e.ingest_stats()['rows']
+        3
         """
+        start = time.perf_counter()
         input_stream.readline()
-        line = input_stream.readline()
-        while line != '':
-            new = line.strip().split(',')
-            self.update_results(new[RIDING].strip('"'), new[PARTY].strip('"'),
-                                int(new[VOTES]))
-            line = input_stream.readline()
+        self._start_update()
+        rows = 0
+        self._unranked = {} if len(self._results) > 0 else None
+        batch = list(islice(input_stream, BATCH_ROWS))
+        while len(batch) > 0:
+            rows += len(batch)
+            self._merge_lines(batch)
+            batch = list(islice(input_stream, BATCH_ROWS))
+        if self._unranked is None:
+            self._unranked = dict.fromkeys(self._results)
+        self._rerank(self._unranked)
+        self._unranked = {}
+        seconds = time.perf_counter() - start
+        self._ingest_stats = {
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds > 0 else 0.0
+        }
+
+    def _merge_lines(self, lines: List[str]) -> None:
+        """Add the votes in <lines> to this election and their ridings to
+        _unranked, unless it is None, and log the parties given votes.
+
+        Each line in <lines> is a row of a csv file in the format defined in
+        the A0 handout.  Lines with a quote character are parsed with the csv
+        module, and the rest are split on commas.  Rows with no votes are
+        skipped.  The votes are added straight to _results and _totals, so
+        subclasses that keep their results elsewhere override this method.
+        Every riding shares one string object per party, to save memory.
+        """
+        unranked = self._unranked
+        results = self._results
+        totals = self._totals
+        old = totals.copy()
+        names = {name: name for name in self._parties}
+        for line in lines:
+            row = next(csv.reader([line])) if '"' in line else line.split(',')
+            votes = int(row[VOTES])
+            if votes > 0:
+                riding = row[RIDING]
+                party = names.get(row[PARTY])
+                if party is None:
+                    party = names[row[PARTY]] = row[PARTY]
+                    self._add_party(party)
+                party_data = results.get(riding)
+                if party_data is None:
+                    self._add_riding(riding)
+                    party_data = results[riding]
+                party_data[party] = party_data.get(party, 0) + votes
+                totals[party] += votes
+                if unranked is not None:
+                    unranked[riding] = None
+        self._log_change(None, [p for p in totals if totals[p] != old.get(p)])
+
+    def merge_batch(self, batch: Dict[Tuple[str, str], int]) -> None:
+        """Merge <batch> into this election.
+
+        Each key in <batch> is a (riding, party) pair, and its value is the
+        number of additional votes that party received in that riding.  The
+        rankings, leaders and seats are brought up to date once, at the end.
+
+        Precondition: every value in <batch> is at least 1.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 5)
+        >>> e.merge_batch({('r1', 'lib'): 7, ('r2', 'pc'): 1,
+        ...                 ('r1', 'ndp'): 2})
+        >>> e.riding_winners('r1')
+        ['ndp', 'lib']
+        >>> e.party_seats() == {'ndp': 0, 'lib': 0, 'pc': 1}
+        True
+        """
+        if len(batch) == 0:
+            return
+        self._start_update()
+        ridings = {}
+        parties = {}
+        for key, votes in batch.items():
+            riding, party = key
+            if party not in self._party_ids:
+                self._add_party(party)
+            if riding not in self._leaders:
+                self._add_riding(riding)
+            if self._add_votes(riding, party, votes) == votes:
+                self._rankings[riding].append(party)
+            self._totals[party] += votes
+            ridings[riding] = None
+            parties[party] = None
+        self._rerank(ridings)
+        self._log_change(None, list(parties))
+
+    def _rerank(self, ridings: Dict[str, None]) -> None:
+        """Sort the ranking of each riding in <ridings> again, and recompute
+        its leaders and the seat it gives, after votes have been added to it.
+
+        Parties missing from the ranking of a riding are added to its end in
+        the order of _riding_results, that is, the order they got their first
+        votes there.  Sorting is stable, so tied parties keep their order.
+        The ridings, and the parties whose seats changed, are logged.
+
+        Precondition: every riding in <ridings> has at least 1 vote recorded
+        in this election.
+        """
+        changed = []
+        for riding in ridings:
+            party_data = self._riding_results(riding)
+            ranking = self._rankings[riding]
+            if len(ranking) < len(party_data):
+                ranking.extend(islice(party_data, len(ranking), None))
+            ranking.sort(key=party_data.__getitem__, reverse=True)
+            top = party_data[ranking[0]]
+            if len(ranking) > 1 and party_data[ranking[1]] == top:
+                leaders = [p for p in ranking if party_data[p] == top]
+            else:
+                leaders = ranking[:1]
+            old_leaders = self._leaders[riding]
+            if leaders != old_leaders:
+                if len(old_leaders) == 1:
+                    self._seats[old_leaders[0]] -= 1
+                    changed.append(old_leaders[0])
+                if len(leaders) == 1:
+                    self._seats[leaders[0]] += 1
+                    changed.append(leaders[0])
+                self._leaders[riding] = leaders
+        self._changes.log_all('riding', ridings)
+        self._log_change(None, changed)
+
+    def ingest_stats(self) -> Dict[str, float]:
+        """Return statistics about the most recent call to read_results: the
+        number of rows read, the time it took in seconds, and the number of
+        rows read per second.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.ingest_stats() == {'rows': 0, 'seconds': 0.0,
+        ...                      'rows_per_second': 0.0}
+        True
+        """
+        return dict(self._ingest_stats)
 
     def results_for(self, riding: str, party: str) -> Optional[int]:
         """Return the number of votes received in <riding> by <party> in
@@ -177,14 +536,14 @@ class Election:
         >>> e.update_results('r1', 'pc', 3)
         >>> e.riding_winners('r1')
         ['pc']
+        >>> e.update_results('r1', 'ndp', 2)
+        >>> e.riding_winners('r1')
+        ['ndp', 'pc']
         """
-        party_data = self._results[riding]
-        max_value = max(party_data.values())
-        result_list = []
-        for p in party_data:
-            if party_data[p] == max_value:
-                result_list.append(p)
-        return result_list
+        leaders = self._leaders[riding]
+        if len(leaders) == 1:
+            return leaders[:]
+        return [p for p in self._riding_results(riding) if p in leaders]
 
     def popular_vote(self) -> Dict[str, int]:
         """For each party, return the total number of votes it earned, across
@@ -204,14 +563,7 @@ class Election:
         >>> e.popular_vote() == {'ndp': 8, 'lib': 7, 'pc': 7, 'green': 6}
         True
         """
-        party_vote_total = {}
-        for party in self._parties:
-            if party not in party_vote_total:
-                party_vote_total[party] = 0
-            for riding in self._results:
-                if party in self._results[riding]:
-                    party_vote_total[party] += self._results[riding][party]
-        return party_vote_total
+        return dict(self._totals)
 
     def party_seats(self) -> Dict[str, int]:
         """For each party, return the number of ridings that it won in this
@@ -233,15 +585,7 @@ class Election:
         >>> e.party_seats() == {'pc': 1, 'ndp': 1, 'lib': 0, 'green': 0}
         True
         """
-        new_dict = {}
-        for p in self._parties:
-            if p not in new_dict:
-                new_dict[p] = 0
-        for riding in self._results:
-            if len(self.riding_winners(riding)) == 1:
-                for i in self.riding_winners(riding):
-                    new_dict[i] += 1
-        return new_dict
+        return dict(self._seats)
 
     def election_winners(self) -> List[str]:
         """Return the party (or parties, in the case of a tie) that won the
@@ -261,32 +605,116 @@ class Election:
         >>> e.election_winners()
         ['pc']
         """
+        if 'election_winners' in self._cache:
+            self._cache_hits += 1
+            return self._cache['election_winners'][:]
+        self._cache_misses += 1
         final_list = []
-        for p in self.party_seats():
-            max_number = max(self.party_seats().values())
-            if self.party_seats()[p] == max_number:
-                final_list.append(p)
-        return final_list
+        seats = self.party_seats()
+        if len(seats) > 0:
+            max_number = max(seats.values())
+            for p in seats:
+                if seats[p] == max_number:
+                    final_list.append(p)
+        self._cache['election_winners'] = final_list
+        return final_list[:]
+
+    def cache_info(self) -> Dict[str, int]:
+        """Return the number of queries on this election that were answered
+        from its cache, and the number that had to be computed.
+
+        The cache is emptied every time update_results is called.
+
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.election_winners()
+        ['ndp']
+        >>> e.election_winners()
+        ['ndp']
+        >>> e.cache_info()
+        {'hits': 1, 'misses': 1}
+        >>> e.update_results('r2', 'lib', 1)
+        >>> e.election_winners()
+        ['ndp', 'lib']
+        >>> e.cache_info()
+        {'hits': 1, 'misses': 2}
+        """
+        return {'hits': self._cache_hits, 'misses': self._cache_misses}
+
+    def _ranked_results(self, riding: str
+                        ) -> Tuple[List[str], Dict[str, int]]:
+        """Return the parties with votes in <riding>, from most votes to
+        fewest, along with the results of <riding> (see _riding_results).
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        if riding in self._rankings:
+            return self._rankings[riding], self._riding_results(riding)
+        return RankedResults._ranked_results(self, riding)
+
+
+def tally_lines(lines: Iterable[str]) -> Dict[Tuple[str, str], int]:
+    """Return the total votes in <lines> for each (riding, party) pair.
+
+    Each line in <lines> is a row of a csv file in the format defined in the
+    A0 handout.  Lines with a quote character are parsed with the csv module,
+    and the rest are simply split on commas.  Rows with no votes are left
+    out.
+
+    >>> lines = [',r1' + ',' * 12 + 'ndp,,,,4',
+    ...          ',"r1"' + ',' * 12 + 'ndp,,,,6']
+    >>> tally_lines(lines)
+    {('r1', 'ndp'): 10}
+    """
+    tally = {}
+    for line in lines:
+        row = next(csv.reader([line])) if '"' in line else line.split(',')
+        votes = int(row[VOTES])
+        if votes > 0:
+            key = (row[RIDING], row[PARTY])
+            tally[key] = tally.get(key, 0) + votes
+    return tally
+
+
+def _tally_file(path: str) -> Dict[Tuple[str, str], int]:
+    """Return the total votes in the csv file at <path> for each
+    (riding, party) pair.  This runs in a worker process for
+    Jurisdiction.read_results_files, and reads the file one row at a time.
+
+    Precondition: <path> names a csv file, in the format defined in the A0
+    handout, with one row per line.
+    """
+    with open(path) as input_stream:
+        input_stream.readline()
+        return tally_lines(input_stream)
 
 
-class Jurisdiction:
+class Jurisdiction(ElectionHistory):
     """The election history for a jurisdiction that is a parliamentary
     democracy.
 
+    The elections are kept in _elections, indexed by date (see ElectionHistory).
+
     === Private Attributes ===
     _name: the name of this jurisdiction.
-    _elections: the election history for this jurisdiction.  Each key is a date,
-        and its value holds the results of an election that was held on that
-        date.
-
-    === Representation Invariants ==
-    None.
+    _history_cache: the result of party_history for each party it has been
+        called on, along with the _snapshot of _elections it was computed from.
+    _cache_hits: the number of queries answered from _history_cache.
+    _cache_misses: the number of queries that had to be computed.
+    _changes_cache: the ridings removed and added between each adjacent pair
+        of elections that riding_changes has compared, along with the
+        versions of _elections and of both elections when they were compared.
 
     === Sample Usage ===
     # See the method docstrings for sample usage.
     """
     _name: str
     _elections: Dict[date, Election]
+    _history_cache: Dict[str, Tuple[tuple, Dict[date, float]]]
+    _cache_hits: int
+    _cache_misses: int
+    _changes_cache: Dict[Tuple[date, date],
+                         Tuple[tuple, Tuple[Set[str], Set[str]]]]
 
     def __init__(self, name: str) -> None:
         """Initialize this jurisdiction, with no elections so far.
@@ -297,8 +725,12 @@ class Jurisdiction:
         >>> country._elections
         {}
         """
+        ElectionHistory.__init__(self)
         self._name = name
-        self._elections = {}
+        self._history_cache = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._changes_cache = {}
 
     def read_results(self, year: int, month: int, day: int,
                      input_stream: TextIO) -> None:
@@ -312,12 +744,69 @@ class Jurisdiction:
         """
         new_date = date(year, month, day)
         if new_date not in self._elections:
-            self._elections[new_date] = Election(new_date)
+            self._elections[new_date] = self._new_election(new_date)
         self._elections[new_date].read_results(input_stream)
 
+    def read_results_files(self, year: int, month: int, day: int,
+                           paths: List[str]) -> None:
+        """Read and record results from every csv file in <paths> for an
+        election in this jurisdiction.
+
+        Each file is parsed and tallied in a separate worker process, with
+        one worker per core. The tallies are then merged into the election
+        on this date in the order of <paths>. A single file is read in this
+        process.
+
+        If there are already some results stored for an election on this date,
+        add to them.
+
+        Precondition: each path in <paths> names a csv file, in the format
+        defined in the A0 handout.
+
+        >>> import os, tempfile
+        >>> header = ','.join(['x'] * (VOTES + 1))
+        >>> paths = []
+        >>> with tempfile.TemporaryDirectory() as folder:
+        ...     for riding, votes in [('r1', 3), ('r2', 4)]:
+        ...         cols = [''] * (VOTES + 1)
+        ...         cols[RIDING], cols[PARTY] = riding, 'ndp'
+        ...         cols[VOTES] = str(votes)
+        ...         paths.append(os.path.join(folder, riding + '.csv'))
+        ...         with open(paths[-1], 'w') as f:
+        ...             _ = f.write(header + '\\n' + ','.join(cols) + '\\n')
+        ...     j = Jurisdiction('Canada')
+        ...     j.read_results_files(2015, 10, 19, paths)
+        >>> j.party_history('ndp')
+        {datetime.date(2015, 10, 19): 1.0}
+        >>> j._elections[date(2015, 10, 19)].ridings_recorded()
+        ['r1', 'r2']
+        """
+        new_date = date(year, month, day)
+        if new_date not in self._elections:
+            self._elections[new_date] = self._new_election(new_date)
+        election = self._elections[new_date]
+        if len(paths) <= 1:
+            for path in paths:
+                election.merge_batch(_tally_file(path))
+        else:
+            with ProcessPoolExecutor() as pool:
+                for tally in pool.map(_tally_file, paths):
+                    election.merge_batch(tally)
+
+    def _new_election(self, d: date) -> Election:
+        """Return a new election on date <d> with no results, to be recorded
+        in this jurisdiction.  Subclasses override this to store their
+        elections differently.
+
+        >>> type(Jurisdiction('Canada')._new_election(
+        ...     date(2000, 2, 8))).__name__
+        'Election'
+        """
+        return Election(d)
+
     def party_wins(self, party: str) -> List[date]:
         """Return a list of all dates on which <party> won an election in this
-        jurisdiction.
+        jurisdiction, in order.
 
         If the party tied for most seats in an election, do include that date
         in the result.
@@ -348,7 +837,7 @@ class Jurisdiction:
         [datetime.date(2003, 5, 16), datetime.date(2003, 6, 1)]
         """
         result_list = []
-        for d in self._elections:
+        for d in self._sorted_dates():
             if party in self._elections[d].election_winners():
                 result_list.append(d)
         return result_list
@@ -385,23 +874,54 @@ class Jurisdiction:
         date(2004, 5, 16): 0.2}
         True
         """
+        snapshot = self._snapshot()
+        if party in self._history_cache and \
+                self._history_cache[party][0] == snapshot:
+            self._cache_hits += 1
+        else:
+            self._cache_misses += 1
+            self._history_cache[party] = (snapshot, self._party_shares(party))
+        return dict(self._history_cache[party][1])
+
+    def _party_shares(self, party: str) -> Dict[date, float]:
+        """Return party_history(<party>), computed without the cache.
+        """
         percent_list = {}
         for d in self._elections:
-            total = 0
-            for each_p in self._elections[d].popular_vote():
-                total += self._elections[d].popular_vote()[each_p]
-                if party not in self._elections[d].popular_vote():
-                    party_vote = 0
-                    percent_num = party_vote / total
-                    percent_list[d] = 0
-                    percent_list[d] += percent_num
-                else:
-                    party_vote = self._elections[d].popular_vote()[party]
-                    percent_num = party_vote / total
-                    percent_list[d] = 0
-                    percent_list[d] += percent_num
+            votes = self._elections[d].popular_vote()
+            if len(votes) > 0:
+                percent_list[d] = votes.get(party, 0) / sum(votes.values())
         return percent_list
 
+    def _snapshot(self) -> tuple:
+        """Return a value that changes whenever an election is added to or
+        replaced in this jurisdiction, or has its results updated.
+        """
+        return (self._elections.version,
+                tuple(e.version() for e in self._elections.values()))
+
+    def cache_info(self) -> Dict[str, int]:
+        """Return the number of party_history queries on this jurisdiction
+        that were answered from its cache, and the number that had to be
+        computed.
+
+        >>> j = Jurisdiction('Canada')
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r1', 'lib', 3)
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> j.party_history('lib') == j.party_history('lib')
+        True
+        >>> j.cache_info()
+        {'hits': 1, 'misses': 1}
+        >>> e.update_results('r1', 'ndp', 4)
+        >>> j.party_history('lib')
+        {datetime.date(2000, 2, 8): 0.375}
+        >>> j.cache_info()
+        {'hits': 1, 'misses': 2}
+        """
+        return {'hits': self._cache_hits, 'misses': self._cache_misses}
+
     def riding_changes(self) -> List[Tuple[Set[str], Set[str]]]:
         """Return the changes in ridings across elections in this jurisdiction.
 
@@ -409,6 +929,9 @@ class Jurisdiction:
         The tuple should contain, first, a set of ridings that were removed
         between these two elections, and then a set of ridings that were added.
 
+        The changes between each pair are cached until either election in it
+        is updated, or an election is added to or replaced in _elections.
+
         Precondition: There is at least one election recorded for this
         jurisdiction.
 
@@ -429,19 +952,22 @@ class Jurisdiction:
         >>> j.riding_changes() == [({'r2'}, {'r3'})]
         True
         """
-        my_dates = list(self._elections.keys())
-        my_dates.sort()
+        my_dates = self._sorted_dates()
         my_result_list = []
         for my_i in range(len(my_dates) - 1):
             date_one = my_dates[my_i]
             date_two = my_dates[my_i + 1]
             a = self._elections[date_one]
             b = self._elections[date_two]
-            i = set(a.ridings_recorded())
-            j = set(b.ridings_recorded())
-            difference1 = i - j
-            difference2 = j - i
-            my_result_list.append((difference1, difference2))
+            key = (self._elections.version, a.version(), b.version())
+            cached = self._changes_cache.get((date_one, date_two))
+            if cached is None or cached[0] != key:
+                i = set(a.ridings_recorded())
+                j = set(b.ridings_recorded())
+                cached = (key, (i - j, j - i))
+                self._changes_cache[(date_one, date_two)] = cached
+            difference1, difference2 = cached[1]
+            my_result_list.append((set(difference1), set(difference2)))
         return my_result_list
 
 
@@ -449,9 +975,11 @@ if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'allowed-io': ['Election.read_results', 'Jurisdiction.read_results'],
+        'allowed-io': ['Election.read_results', 'Jurisdiction.read_results',
+                       '_tally_file'],
         'allowed-import-modules': [
-            'doctest', 'python_ta', 'datetime', 'typing'
+            'doctest', 'python_ta', 'datetime', 'typing', 'csv', 'time',
+            'itertools', 'concurrent.futures', 'election_queries'
         ],
         'max-attributes': 15
     })
@@ -460,14 +988,11 @@ if __name__ == '__main__':
 
     doctest.testmod()
 
-    # An example of reading election results from a file.
+    # An example of reading election results from several files at once.
     c = Jurisdiction('Canada')
-    with open('data/parkdale-highpark.csv') as file:
-        c.read_results(2015, 2, 3, file)
-    with open('data/nunavut.csv') as file:
-        c.read_results(2015, 2, 3, file)
-    with open('data/labrador.csv') as file:
-        c.read_results(2015, 2, 3, file)
+    c.read_results_files(2015, 2, 3, ['data/parkdale-highpark.csv',
+                                      'data/nunavut.csv',
+                                      'data/labrador.csv'])
     # An example of using that data to calculate some things.
     print(c.party_history('Liberal'))
     print(c.party_history('Conservative'))
@@ -20,12 +20,20 @@ This module contains all of the classes necessary for a1_game.py to run.
 
 from __future__ import annotations
 
+import random
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from heapq import merge
 from random import shuffle
-from typing import List, Tuple, Optional
+from typing import Dict, List, Sequence, Set, Tuple, Optional
 
 # Each raccoon moves every this many turns
 RACCOON_TURN_FREQUENCY = 20
 
+# Number of games a worker process plays per task in simulate_games
+GAMES_PER_TASK = 64
+
 # Directions dx, dy
 UP = (0, -1)
 DOWN = (0, 1)
@@ -33,6 +41,16 @@ LEFT = (-1, 0)
 RIGHT = (1, 0)
 DIRECTIONS = [LEFT, UP, RIGHT, DOWN]
 
+# Codes for what a tile holds, as stored in GameBoard._codes
+EMPTY_TILE = 0
+PLAYER_TILE = 1
+RACCOON_TILE = 2
+SMART_RACCOON_TILE = 3
+GARBAGE_CAN_TILE = 4
+RECYCLING_BIN_TILE = 5
+FULL_CAN_TILE = 6  # a Raccoon inside a GarbageCan
+OFF_BOARD = 255  # returned by GameBoard.code_at for positions off the board
+
 
 def get_shuffled_directions() -> List[Tuple[int, int]]:
     """
@@ -71,15 +89,55 @@ class GameBoard:
     # === Private Attributes ===
     # _player:
     #   the player of the game
-    # _grid:
-    # to record and keep track of the characters on the board.
+    # _codes:
+    #   the code (such as EMPTY_TILE or RACCOON_TILE) of what each tile holds,
+    #   with tile (x, y) at index y * width + x
+    # _occupants:
+    #   the characters on each non-empty tile, keyed by the tile's index in
+    #   _codes.  A tile with a Raccoon inside a GarbageCan lists the
+    #   GarbageCan first.
+    # _indexes:
+    #   for each of RACCOON_TILE, SMART_RACCOON_TILE, GARBAGE_CAN_TILE and
+    #   RECYCLING_BIN_TILE, the sorted indexes in _codes of the tiles with
+    #   that kind of character, so that they are in order row by row.  A
+    #   tile with a Raccoon inside a GarbageCan is listed under both.
+    # _bin_parent:
+    #   for the index (in _codes) of each tile with a RecyclingBin, the index
+    #   of another bin in the same cluster of adjacent bins, or itself if it
+    #   is the root of its cluster.  Following these links from any bin leads
+    #   to the root of its cluster.
+    # _bin_size:
+    #   the number of bins in the cluster of each root in _bin_parent
+    # _cluster_counts:
+    #   for each cluster size, how many clusters of bins have that size
+    # _lines:
+    #   the sorted x coordinates of the tiles in each row y (at index y), and
+    #   the sorted y coordinates of the tiles in each column x (at index
+    #   height + x), that hold a character other than the Player
+    # _trapped:
+    #   the raccoons, not in a GarbageCan, that were trapped when last checked
+    # _free:
+    #   the raccoons, not in a GarbageCan, that were not trapped when last
+    #   checked
+    # _dirty:
+    #   the raccoons whose tile, or a tile next to it, has changed since they
+    #   were last checked, so that _trapped and _free may be out of date
 
     ended: bool
     turns: int
     width: int
     height: int
     _player: Optional[Player]
-    _grid: List[List]
+    _codes: bytearray
+    _occupants: Dict[int, List[Character]]
+    _indexes: Dict[int, List[int]]
+    _bin_parent: Dict[int, int]
+    _bin_size: Dict[int, int]
+    _cluster_counts: Dict[int, int]
+    _lines: List[List[int]]
+    _trapped: Set[Raccoon]
+    _free: Set[Raccoon]
+    _dirty: Set[Raccoon]
 
     def __init__(self, w: int, h: int) -> None:
         """Initialize this Board to be of the given width <w> and height <h> in
@@ -105,11 +163,18 @@ class GameBoard:
 
         self._player = None
 
-        self._grid = []
-        for i in range(self.height):
-            self._grid.append([])
-            for _ in range(self.width):
-                self._grid[i].append([])
+        self._codes = bytearray(self.width * self.height)
+        self._occupants = {}
+        self._indexes = {code: [] for code in (
+            RACCOON_TILE, SMART_RACCOON_TILE, GARBAGE_CAN_TILE,
+            RECYCLING_BIN_TILE)}
+        self._bin_parent = {}
+        self._bin_size = {}
+        self._cluster_counts = {}
+        self._lines = [[] for _ in range(self.height + self.width)]
+        self._trapped = set()
+        self._free = set()
+        self._dirty = set()
 
     def f1(self, c: Character, direction: Tuple[int, int]) -> bool:
         """
@@ -122,22 +187,12 @@ class GameBoard:
         """
 
         nx, ny = c.x + direction[0], c.y + direction[1]
-        if self.on_board(nx, ny):
-            tiles = self.at(nx, ny)
-            if len(tiles) == 0:  # empty tile
-                return True
-            elif len(tiles) == 1:
-                if tiles[0].get_char() != c.get_char():  # other character
-                    return False
-                else:
-                    c = tiles[0]
-                    if c.board.f1(c, direction) is True:
-                        return True
-            else:
-                return False  # other character
-        else:
-            return False  # out of boundaries
-        return None
+        code = self.code_at(nx, ny)
+        if code == EMPTY_TILE:
+            return True
+        elif code == _code_of(c):  # the same kind of character
+            return self.f1(self.character_at(nx, ny), direction)
+        return False  # other character, or out of boundaries
 
     def f3(self, f3_coordinate: Tuple) -> bool:
         """a helper function to check if a specific tile
@@ -150,17 +205,8 @@ class GameBoard:
         >>> g.f3((0, 1))
         True
         """
-        if self.on_board(f3_coordinate[0],
-                         f3_coordinate[1]) is False:
-            return False
-        a = self.at(f3_coordinate[0], f3_coordinate[1])
-        if len(a) == 0:
-            return True
-        elif len(a) == 1 and isinstance(a[0], GarbageCan):
-            return True
-        elif len(a) == 1 and isinstance(a[0], Player):
-            return True
-        return False
+        return self.code_at(f3_coordinate[0], f3_coordinate[1]) in \
+            (EMPTY_TILE, GARBAGE_CAN_TILE, PLAYER_TILE)
 
     def f4(self, rac: Raccoon, move_direction: Tuple) -> bool:
         """Given a <move_direction> for a specific raccoon <rac>,
@@ -176,24 +222,43 @@ class GameBoard:
         True
         """
 
-        n = (rac.x + move_direction[0], rac.y + move_direction[1])
-        if self.on_board(n[0], n[1]) is False:
-            return False
-        if len(self.at(n[0], n[1])) == 2:
-            return False
-        elif len(self.at(n[0], n[1])) == 1 and not \
-                isinstance(self.at(n[0], n[1])[0], GarbageCan):
-            return False
-        elif len(self.at(n[0], n[1])) == 1 and \
-                isinstance(self.at(n[0], n[1])[0], GarbageCan) and \
-                self.at(n[0], n[1])[0].locked is True:
-            return True
-        elif len(self.at(n[0], n[1])) == 1 and \
-                isinstance(self.at(n[0], n[1])[0], GarbageCan) and \
-                self.at(n[0], n[1])[0].locked is False:
-            return True
-        elif len(self.at(n[0], n[1])) == 0:
-            return True
+        return self.code_at(rac.x + move_direction[0],
+                            rac.y + move_direction[1]) in \
+            (EMPTY_TILE, GARBAGE_CAN_TILE)
+
+    def sight_distance(self, x: int, y: int,
+                       direction: Tuple[int, int]) -> Optional[int]:
+        """Return how many tiles away from tile (x, y) the nearest
+        GarbageCan in <direction> is, if nothing but the Player is between
+        them. Return None if there is no such GarbageCan.
+
+        >>> b = GameBoard(6, 1)
+        >>> _ = GarbageCan(b, 0, 0, True)
+        >>> _ = Player(b, 1, 0)
+        >>> _ = GarbageCan(b, 5, 0, False)
+        >>> _ = RecyclingBin(b, 4, 0)
+        >>> b.sight_distance(3, 0, LEFT)
+        3
+        >>> b.sight_distance(3, 0, RIGHT) is None
+        True
+        """
+        if direction[1] == 0:
+            line, start = self._lines[y], x
+        else:
+            line, start = self._lines[self.height + x], y
+        if direction[0] + direction[1] > 0:
+            i = bisect_right(line, start)
+            if i == len(line):
+                return None
+            distance = line[i] - start
+        else:
+            i = bisect_left(line, start)
+            if i == 0:
+                return None
+            distance = start - line[i - 1]
+        if self._codes[(y + direction[1] * distance) * self.width
+                       + x + direction[0] * distance] == GARBAGE_CAN_TILE:
+            return distance
         return None
 
     def place_character(self, c: Character) -> None:
@@ -218,14 +283,120 @@ class GameBoard:
         >>> r = Raccoon(b, 1, 1)  # when a Raccoon is created, it is placed on b
         >>> b.at(1, 1)[0] == r  # requires GameBoard.at be implemented to work
         True
+        >>> _ = Raccoon(b, 0, 0)
+        >>> b._indexes[RACCOON_TILE]
+        [0, 4]
         """
+        index = c.y * self.width + c.x
         if isinstance(c, Player):
             self._player = c
-        elif isinstance(c, Raccoon) and len(self._grid[c.y][c.x]) == 1 \
-                and isinstance(self._grid[c.y][c.x][0], GarbageCan) and \
-                self._grid[c.y][c.x][0].locked is False:
+        elif isinstance(c, Raccoon) and \
+                self._codes[index] == GARBAGE_CAN_TILE and \
+                self._occupants[index][0].locked is False:
             c.inside_can = True
-        self._grid[c.y][c.x].append(c)
+        self._add_occupant(c)
+
+    def _add_occupant(self, c: Character) -> None:
+        """Record that character <c> is on tile (c.x, c.y).
+        """
+        index = c.y * self.width + c.x
+        if c is not self._player:
+            insort(self._indexes[_code_of(c)], index)
+        if index in self._occupants:
+            self._occupants[index].append(c)
+            self._codes[index] = FULL_CAN_TILE
+        else:
+            self._occupants[index] = [c]
+            self._codes[index] = _code_of(c)
+            if self._codes[index] == RECYCLING_BIN_TILE:
+                self._add_bin(c.x, c.y)
+            if self._codes[index] != PLAYER_TILE:
+                insort(self._lines[c.y], c.x)
+                insort(self._lines[self.height + c.x], c.y)
+        self._mark_dirty(c.x, c.y)
+
+    def _mark_dirty(self, x: int, y: int) -> None:
+        """Record that tile (x, y) has changed, so any raccoon on it or next
+        to it must have its trapped state checked again.
+        """
+        for nx, ny in [(x, y)] + get_neighbours((x, y)):
+            if self.code_at(nx, ny) in (RACCOON_TILE, SMART_RACCOON_TILE,
+                                        FULL_CAN_TILE):
+                self._dirty.add(self._occupants[ny * self.width + nx][-1])
+
+    def _find_bin(self, index: int) -> int:
+        """Return the index of the root of the cluster containing the bin at
+        <index> in _codes, shortening the path to it along the way.
+        """
+        root = index
+        while self._bin_parent[root] != root:
+            root = self._bin_parent[root]
+        while self._bin_parent[index] != root:
+            self._bin_parent[index], index = root, self._bin_parent[index]
+        return root
+
+    def _count_cluster(self, size: int, change: int) -> None:
+        """Add <change> to the number of clusters of bins of size <size>.
+        """
+        count = self._cluster_counts.get(size, 0) + change
+        if count == 0:
+            del self._cluster_counts[size]
+        else:
+            self._cluster_counts[size] = count
+
+    def _add_bin(self, x: int, y: int) -> None:
+        """Add the RecyclingBin on tile (x, y) to the bin clusters, joining
+        the clusters of any bins next to it.
+        """
+        index = y * self.width + x
+        self._bin_parent[index] = index
+        self._bin_size[index] = 1
+        self._count_cluster(1, 1)
+        for nx, ny in get_neighbours((x, y)):
+            other = ny * self.width + nx
+            if self.code_at(nx, ny) == RECYCLING_BIN_TILE and \
+                    other in self._bin_parent:
+                self._join_bins(index, other)
+
+    def _join_bins(self, index: int, other: int) -> None:
+        """Join the clusters of the bins at <index> and <other> in _codes, if
+        they are not already the same cluster.
+        """
+        root, other_root = self._find_bin(index), self._find_bin(other)
+        if root == other_root:
+            return
+        if self._bin_size[root] < self._bin_size[other_root]:
+            root, other_root = other_root, root
+        self._count_cluster(self._bin_size[root], -1)
+        self._count_cluster(self._bin_size[other_root], -1)
+        self._bin_parent[other_root] = root
+        self._bin_size[root] += self._bin_size.pop(other_root)
+        self._count_cluster(self._bin_size[root], 1)
+
+    def _remove_bin(self, x: int, y: int) -> None:
+        """Remove the RecyclingBin on tile (x, y) from the bin clusters.
+
+        Its cluster may split, so the rest of the cluster is found with a
+        breadth-first search and added again bin by bin.  This takes time
+        proportional to the size of the cluster.
+        """
+        index = y * self.width + x
+        self._count_cluster(self._bin_size.pop(self._find_bin(index)), -1)
+        cluster = [(x, y)]
+        seen = {index}
+        i = 0
+        while i < len(cluster):
+            for nx, ny in get_neighbours(cluster[i]):
+                other = ny * self.width + nx
+                if self.code_at(nx, ny) == RECYCLING_BIN_TILE and \
+                        other not in seen:
+                    seen.add(other)
+                    cluster.append((nx, ny))
+            i += 1
+        for other in seen:
+            del self._bin_parent[other]
+        for nx, ny in cluster[1:]:
+            self._add_bin(nx, ny)
 
     def at(self, x: int, y: int) -> List[Character]:
         """Return the characters at tile (x, y).
@@ -248,7 +419,47 @@ class GameBoard:
         >>> b.at(0, 1)[0] == p
         True
         """
-        return self._grid[y][x].copy()
+        if not self.on_board(x, y):
+            return []
+        return list(self._occupants.get(y * self.width + x, ()))
+
+    def code_at(self, x: int, y: int) -> int:
+        """Return the code of what tile (x, y) holds: EMPTY_TILE,
+        PLAYER_TILE, RACCOON_TILE, SMART_RACCOON_TILE, GARBAGE_CAN_TILE,
+        RECYCLING_BIN_TILE or FULL_CAN_TILE.  Return OFF_BOARD if (x, y) is
+        not on the board.
+
+        >>> b = GameBoard(3, 2)
+        >>> _ = Raccoon(b, 1, 1)
+        >>> b.code_at(1, 1) == RACCOON_TILE
+        True
+        >>> b.code_at(0, 1) == EMPTY_TILE
+        True
+        >>> b.code_at(3, 1) == OFF_BOARD
+        True
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self._codes[y * self.width + x]
+        return OFF_BOARD
+
+    def character_at(self, x: int, y: int) -> Optional[Character]:
+        """Return the character at tile (x, y), or None if there is none.
+        If a Raccoon is inside a GarbageCan there, return the GarbageCan.
+
+        Precondition: (x, y) is on the board.
+
+        >>> b = GameBoard(3, 2)
+        >>> g = GarbageCan(b, 1, 1, False)
+        >>> _ = Raccoon(b, 1, 1)
+        >>> b.character_at(1, 1) is g
+        True
+        >>> b.character_at(0, 0) is None
+        True
+        """
+        occupants = self._occupants.get(y * self.width + x)
+        if occupants is None:
+            return None
+        return occupants[0]
 
     def to_grid(self) -> List[List[chr]]:
         """
@@ -273,15 +484,16 @@ class GameBoard:
         [['P', '-', '-'], ['-', 'R', 'C']]
         """
         result = []
-        for row in self._grid:
+        for y in range(self.height):
             tmp = []
-            for cell in row:
-                if len(cell) == 0:
+            for index in range(y * self.width, (y + 1) * self.width):
+                code = self._codes[index]
+                if code == EMPTY_TILE:
                     tmp.append('-')
-                elif len(cell) == 2:
+                elif code == FULL_CAN_TILE:
                     tmp.append('@')
                 else:
-                    tmp.append(cell[0].get_char())
+                    tmp.append(self._occupants[index][0].get_char())
             result.append(tmp)
         return result
 
@@ -315,11 +527,22 @@ class GameBoard:
         >>> b.move_direction(r, (0, -1))
         >>> r = Raccoon(b, 1, 0)
         """
-        x, y = character.x, character.y
-        self._grid[y][x] = []
+        index = character.y * self.width + character.x
+        if self._codes[index] == RECYCLING_BIN_TILE:
+            self._remove_bin(character.x, character.y)
+        if self._codes[index] != PLAYER_TILE:
+            tiles = self._indexes[self._codes[index]]
+            del tiles[bisect_left(tiles, index)]
+            row = self._lines[character.y]
+            column = self._lines[self.height + character.x]
+            del row[bisect_left(row, character.x)]
+            del column[bisect_left(column, character.y)]
+        del self._occupants[index]
+        self._codes[index] = EMPTY_TILE
+        self._mark_dirty(character.x, character.y)
         character.x += direction[0]
         character.y += direction[1]
-        self._grid[character.y][character.x].append(character)
+        self._add_occupant(character)
 
     def setup_from_grid(self, grid: str) -> None:
         """
@@ -417,14 +640,12 @@ class GameBoard:
         self.turns += 1  # PROVIDED, DO NOT CHANGE
 
         if self.turns % RACCOON_TURN_FREQUENCY == 0:  # PROVIDED, DO NOT CHANGE
-            raccoons = []
-            for row in self._grid:
-                for tiles in row:
-                    for tile in tiles:
-                        if tile.get_char() in ['S', 'R']:
-                            raccoons.append(tile)
-            for tile in raccoons:
-                tile.take_turn()
+            # both indexes are sorted, so merging them goes row by row
+            raccoons = [self._occupants[index][-1] for index in merge(
+                self._indexes[RACCOON_TILE], self._indexes[SMART_RACCOON_TILE])]
+            for raccoon in raccoons:
+                if not raccoon.inside_can:
+                    raccoon.take_turn()
 
         self.check_game_end()  # PROVIDED, DO NOT CHANGE
 
@@ -434,7 +655,8 @@ class GameBoard:
         The board's Player records the event that happened, so that when the
         Player gets a turn, it can make the move that the user input indicated.
         """
-        self._player.record_event(event)
+        if self._player is not None:
+            self._player.record_event(event)
 
     def check_game_end(self) -> Optional[int]:
         """Check if this game has ended. A game ends when all the raccoons on
@@ -462,22 +684,19 @@ class GameBoard:
         >>> b.ended
         True
         """
-        all_trapped = True
-        trapped_count = 0
-        for x in range(self.width):
-            for y in range(self.height):
-                tiles = self.at(x, y)
-                if len(tiles) == 1:
-                    tile = tiles[0]
-                    if tile.get_char() in ['R', 'S']:
-                        if tile.check_trapped():
-                            trapped_count += 1
-                        else:
-                            all_trapped = False
-
-        self.ended = all_trapped
+        for raccoon in self._dirty:
+            self._trapped.discard(raccoon)
+            self._free.discard(raccoon)
+            if not raccoon.inside_can:
+                if raccoon.check_trapped():
+                    self._trapped.add(raccoon)
+                else:
+                    self._free.add(raccoon)
+        self._dirty.clear()
+
+        self.ended = len(self._free) == 0
         if self.ended:
-            return trapped_count * 10 + self.adjacent_bin_score()
+            return len(self._trapped) * 10 + self.adjacent_bin_score()
         return None
 
     def adjacent_bin_score(self) -> int:
@@ -516,22 +735,7 @@ class GameBoard:
         >>> b.adjacent_bin_score()
         5
         """
-        max_group = 0
-        for x in range(self.width):
-            for y in range(self.height):
-                if self.is_recycling_bin(x, y):
-                    queue = [(x, y)]
-                    group = []
-                    while len(queue) > 0:
-                        p = queue.pop()
-                        group.append(p)
-                        for np in get_neighbours(p):
-                            if self.on_board(np[0], np[1]):
-                                if self.is_recycling_bin(np[0], np[1]):
-                                    if np not in queue and np not in group:
-                                        queue.append(np)
-                    max_group = max([max_group, len(group)])
-        return max_group
+        return max(self._cluster_counts, default=0)
 
     def is_recycling_bin(self, x: int, y: int) -> bool:
         """
@@ -543,11 +747,7 @@ class GameBoard:
         >>> b.is_recycling_bin(1, 1)
         False
         """
-        tiles = self.at(x, y)
-        if len(tiles) == 1:
-            if tiles[0].get_char() == 'B':
-                return True
-        return False
+        return self.code_at(x, y) == RECYCLING_BIN_TILE
 
 
 class Character:
@@ -655,25 +855,17 @@ class RecyclingBin(Character):
         True
         """
         nx, ny = self.x + direction[0], self.y + direction[1]
-        if self.board.on_board(nx, ny) is True:
-            tiles = self.board.at(nx, ny)
-            if len(tiles) == 0:  # empty tile
+        code = self.board.code_at(nx, ny)
+        if code == EMPTY_TILE:
+            self.board.move_direction(self, direction)
+            return True
+        elif code == RECYCLING_BIN_TILE:
+            c = self.board.character_at(nx, ny)
+            if isinstance(c, RecyclingBin) and self.board.f1(c, direction):
+                c.move(direction)
                 self.board.move_direction(self, direction)
                 return True
-            elif len(tiles) == 1:
-                if tiles[0].get_char() != self.get_char():  # other character
-                    return False
-                else:
-                    c = tiles[0]
-                    if c.board.f1(c, direction) is True:
-                        c.move(direction)
-                        self.board.move_direction(self, direction)
-                        return True
-                    return False
-            else:
-                return False  # other character
-        else:
-            return False  # out of boundaries
+        return False  # other character, or out of boundaries
 
     def get_char(self) -> chr:
         """
@@ -766,30 +958,21 @@ class Player(TurnTaker):
         True
         """
         nx, ny = self.x + direction[0], self.y + direction[1]
-        if self.board.on_board(nx, ny):
-            tiles = self.board.at(nx, ny)
-            if len(tiles) == 0:
+        code = self.board.code_at(nx, ny)
+        if code == EMPTY_TILE:
+            self.board.move_direction(self, direction)
+            return True
+        elif code == RECYCLING_BIN_TILE:
+            tile = self.board.character_at(nx, ny)
+            if isinstance(tile, RecyclingBin) and tile.move(direction):
                 self.board.move_direction(self, direction)
                 return True
-            elif len(tiles) == 1:
-                tile = tiles[0]
-                if tile.get_char() in ['R', '@', 'C']:
-                    return False
-                elif tile.get_char() == 'B':
-                    if tile.move(direction):
-                        self.board.move_direction(self, direction)
-                        return True
-                    else:
-                        return False
-                elif tile.get_char() == 'O':
-                    tile.locked = True
-                    return True
-                else:
-                    return False
-            else:
-                return False
-        else:
-            return False
+        elif code == GARBAGE_CAN_TILE:
+            tile = self.board.character_at(nx, ny)
+            if isinstance(tile, GarbageCan) and not tile.locked:
+                tile.locked = True
+                return True
+        return False
 
     def get_char(self) -> chr:
         """
@@ -851,19 +1034,12 @@ class Raccoon(TurnTaker):
         >>> r.check_trapped()
         True
         """
-        trapped = True
         for direction in DIRECTIONS:
-            nx, ny = self.x + direction[0], self.y + direction[1]
-            if self.board.on_board(nx, ny):
-                tiles = self.board.at(nx, ny)
-                if len(tiles) == 0:
-                    trapped = False
-                elif len(tiles) == 1:
-                    tile = tiles[0]
-                    if tile.get_char() not \
-                            in ['P', 'R', '@', 'B', 'S']:
-                        trapped = False
-        return trapped
+            if self.board.code_at(self.x + direction[0],
+                                  self.y + direction[1]) in \
+                    (EMPTY_TILE, GARBAGE_CAN_TILE):
+                return False
+        return True
 
     def move(self, direction: Tuple[int, int]) -> bool:
         """Attempt to move this Raccoon in <direction> and return whether
@@ -913,28 +1089,19 @@ class Raccoon(TurnTaker):
             return False
 
         nx, ny = self.x + direction[0], self.y + direction[1]
-        if self.board.on_board(nx, ny):
-            tiles = self.board.at(nx, ny)
-            if len(tiles) == 0:
-                self.board.move_direction(self, direction)
-                return True
-            elif len(tiles) == 1:
-                tile = tiles[0]
-                if tile.get_char() in ['P', 'R', 'S', 'B']:
-                    return False
-                elif tile.get_char() == 'O':
-                    self.board.move_direction(self, direction)
-                    self.inside_can = True
-                    return True
-                elif tile.get_char() == 'C':
-                    tile.locked = False
-                    return True
-                else:
-                    return False
+        code = self.board.code_at(nx, ny)
+        if code == EMPTY_TILE:
+            self.board.move_direction(self, direction)
+            return True
+        elif code == GARBAGE_CAN_TILE:
+            tile = self.board.character_at(nx, ny)
+            if isinstance(tile, GarbageCan) and tile.locked:
+                tile.locked = False
             else:
-                return False
-        else:
-            return False
+                self.board.move_direction(self, direction)
+                self.inside_can = True
+            return True
+        return False
 
     def take_turn(self) -> None:
         """Take a turn in the game.
@@ -1041,23 +1208,11 @@ class SmartRaccoon(Raccoon):
         True
         """
         a, b = [], []
-        c = 0
         dic = {}
         for i in DIRECTIONS:
-            e = (self.x + i[0], self.y + i[1])
-            while self.board.f3(e) is True:
-                c += 1
-                if len(self.board.at(e[0], e[1])) == 1 and \
-                        isinstance(self.board.at(e[0], e[1])[0], GarbageCan):
-                    dic[i] = c
-                    c = 0
-                    break
-                f = (e[0] + i[0], e[1] + i[1])
-                if self.board.f3(f) is True:
-                    e = f
-                else:
-                    c = 0
-                    break
+            c = self.board.sight_distance(self.x, self.y, i)
+            if c is not None:
+                dic[i] = c
         if len(dic) == 0:
             g = get_shuffled_directions()
             for i in g:
@@ -1124,6 +1279,23 @@ class GarbageCan(Character):
         return False
 
 
+def _code_of(c: Character) -> int:
+    """Return the code of a tile holding only character <c>.
+
+    >>> _code_of(SmartRaccoon(GameBoard(1, 1), 0, 0)) == SMART_RACCOON_TILE
+    True
+    """
+    if isinstance(c, SmartRaccoon):
+        return SMART_RACCOON_TILE
+    elif isinstance(c, Raccoon):
+        return RACCOON_TILE
+    elif isinstance(c, Player):
+        return PLAYER_TILE
+    elif isinstance(c, GarbageCan):
+        return GARBAGE_CAN_TILE
+    return RECYCLING_BIN_TILE
+
+
 # A helper function you may find useful for Task #5, depending on how
 # you implement it.
 def get_neighbours(tile: Tuple[int, int]) -> List[Tuple[int, int]]:
@@ -1142,6 +1314,69 @@ def get_neighbours(tile: Tuple[int, int]) -> List[Tuple[int, int]]:
     return rslt
 
 
+def simulate_game(grid: str, moves: Optional[List[Tuple[int, int]]] = None,
+                  max_turns: int = 1000,
+                  seed: Optional[int] = None) -> Optional[int]:
+    """Play one game without a display on the board described by <grid>, in
+    the format used by GameBoard.setup_from_grid, and return its score, as
+    given by GameBoard.check_game_end.
+
+    Before each turn, the Player is given the next direction in <moves>, or
+    no direction once <moves> runs out. If <moves> is None, the Player is
+    given a random direction every turn. Return None if the game has not
+    ended after <max_turns> turns.
+
+    If <seed> is not None, seed the random module with it first, so that the
+    same game is played every time.
+
+    >>> simulate_game('PB-R', [RIGHT])
+    11
+    >>> simulate_game('P-R-', [], max_turns=3) is None
+    True
+    >>> simulate_game('P-R', seed=3) == simulate_game('P-R', seed=3)
+    True
+    """
+    if seed is not None:
+        random.seed(seed)
+    board = GameBoard(1, 1)
+    board.setup_from_grid(grid)
+    for turn in range(max_turns):
+        if moves is None:
+            board.handle_event(random.choice(DIRECTIONS))
+        elif turn < len(moves):
+            board.handle_event(moves[turn])
+        board.give_turns()
+        if board.ended:
+            break
+    return board.check_game_end()
+
+
+def simulate_games(grid: str, seeds: Sequence[int],
+                   moves: Optional[List[Tuple[int, int]]] = None,
+                   max_turns: int = 1000,
+                   processes: Optional[int] = None) -> List[Optional[int]]:
+    """Play one game with simulate_game on the board described by <grid> for
+    each seed in <seeds>, and return their scores, in order.
+
+    Each game is played with its own seed, so the scores do not depend on
+    how the games are shared out. The games are played in at most
+    <processes> worker processes (by default, one per core), GAMES_PER_TASK
+    at a time. If <processes> is 1, they are played in this process.
+
+    >>> scores = simulate_games('P-R', range(1, 7), max_turns=200, processes=2)
+    >>> scores == simulate_games('P-R', range(1, 7), max_turns=200,
+    ...                          processes=1)
+    True
+    >>> len(scores)
+    6
+    """
+    play = partial(simulate_game, grid, moves, max_turns)
+    if processes == 1 or len(seeds) <= 1:
+        return [play(seed) for seed in seeds]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(play, seeds, chunksize=GAMES_PER_TASK))
+
+
 if __name__ == '__main__':
     import doctest
 
@@ -1152,7 +1387,9 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'allowed-io': [],
         'allowed-import-modules': ['doctest', 'python_ta', 'typing',
-                                   'random', '__future__', 'math'],
+                                   'random', '__future__', 'math',
+                                   'concurrent.futures', 'functools',
+                                   'bisect', 'heapq'],
         'disable': ['E1136'],
         'max-attributes': 15,
         'max-module-lines': 1600
@@ -0,0 +1,411 @@
+"""CSC148 Assignment 0: Election analysis
+
+=== Module description ===
+This module contains tools for analysing the results of an Election (from
+LingXin Li Python project1.py): SwingProjector, which projects seats under
+swings in the popular vote, and VotingSystem and its subclasses, which decide
+the seats of an election under other electoral systems.
+"""
+from heapq import heapify, heappop, heappush
+from importlib import import_module
+from operator import add, mul
+from random import Random
+from typing import Dict, List, Tuple
+
+# The module with Election and Jurisdiction.  Its file name has spaces, so it
+# can only be imported by name.
+ELECTIONS = import_module('LingXin Li Python project1')
+
+
+class SwingProjector:
+    """Projects the seats won by each party in an election if the vote
+    shares of parties were to swing from those in a baseline election.
+
+    A scenario maps parties to their swing: the change in their share of the
+    popular vote, as a fraction (so 0.02 is a gain of two points).  Parties
+    not in a scenario do not swing.  Each projector uses one swing model,
+    chosen when it is created.  Under the 'uniform' model, every
+    riding's share for a party moves by the party's swing.  Under the
+    'proportional' model, every riding's share for a party is scaled by the
+    same ratio as the party's national share.  Shares are not allowed to fall
+    below 0.
+
+    As in Election.party_seats, a riding that is tied does not count as a
+    seat for any party.
+
+    === Private Attributes ===
+    _parties: the parties with votes in the baseline election.
+    _shares: the baseline vote shares.  _shares[r][p] is the share of the
+        votes in the r'th riding of the baseline election won by _parties[p].
+    _national: the baseline share of the popular vote of each party in
+        _parties, in the same order.
+    _model: the swing model, 'uniform' or 'proportional'.
+
+    === Sample Usage ===
+    >>> from datetime import date
+    >>> e = ELECTIONS.Election(date(2015, 10, 19))
+    >>> e.update_results('r1', 'lib', 45)
+    >>> e.update_results('r1', 'pc', 55)
+    >>> e.update_results('r2', 'lib', 60)
+    >>> e.update_results('r2', 'pc', 40)
+    >>> projector = SwingProjector(e)
+    >>> projector.project({'lib': 0.06, 'pc': -0.06}) == {'lib': 2, 'pc': 0}
+    True
+    >>> projector.project({'lib': -0.2}) == {'lib': 0, 'pc': 2}
+    True
+    """
+    _parties: List[str]
+    _shares: List[List[float]]
+    _national: List[float]
+    _model: str
+
+    def __init__(self, baseline: ELECTIONS.Election,
+                 model: str = 'uniform') -> None:
+        """Initialize this projector with the results of <baseline> and the
+        swing <model> ('uniform' or 'proportional').
+
+        Raise ValueError if <model> is not a known swing model.
+        """
+        if model not in ('uniform', 'proportional'):
+            raise ValueError('unknown swing model: ' + model)
+        self._model = model
+        self._parties = list(baseline.popular_vote())
+        self._shares = []
+        for riding in baseline.ridings_recorded():
+            votes = [baseline.results_for(riding, party) or 0
+                     for party in self._parties]
+            total = sum(votes)
+            self._shares.append([v / total for v in votes])
+        popular_vote = baseline.popular_vote()
+        total = sum(popular_vote.values())
+        self._national = [popular_vote[party] / total
+                          for party in self._parties]
+
+    def _adjustments(self, scenario: Dict[str, float]) -> List[float]:
+        """Return the amount that each party's share in each riding is moved
+        by (under the 'uniform' model) or multiplied by (under the
+        'proportional' model) in <scenario>.
+        """
+        swings = [scenario.get(party, 0.0) for party in self._parties]
+        if self._model == 'uniform':
+            return swings
+        return [max(1 + swings[p] / self._national[p], 0.0)
+                if self._national[p] > 0 else 1.0
+                for p in range(len(self._parties))]
+
+    def _seat_counts(self, scenario: Dict[str, float]) -> List[int]:
+        """Return the number of seats won by each party in _parties under
+        <scenario>.
+        """
+        adjustments = self._adjustments(scenario)
+        operation = add if self._model == 'uniform' else mul
+        seats = [0] * len(self._parties)
+        for row in self._shares:
+            shares = list(map(operation, row, adjustments))
+            best = max(shares)
+            if best > 0 and shares.count(best) == 1:
+                seats[shares.index(best)] += 1
+        return seats
+
+    def project(self, scenario: Dict[str, float]) -> Dict[str, int]:
+        """Return the number of seats each party would win under <scenario>.
+
+        >>> from datetime import date
+        >>> e = ELECTIONS.Election(date(2015, 10, 19))
+        >>> e.update_results('r1', 'lib', 45)
+        >>> e.update_results('r1', 'pc', 55)
+        >>> e.update_results('r2', 'lib', 5)
+        >>> e.update_results('r2', 'pc', 95)
+        >>> scenario = {'lib': 0.04, 'pc': -0.04}
+        >>> uniform = SwingProjector(e, 'uniform')
+        >>> uniform.project(scenario) == {'lib': 0, 'pc': 2}
+        True
+        >>> proportional = SwingProjector(e, 'proportional')
+        >>> proportional.project(scenario) == {'lib': 1, 'pc': 1}
+        True
+        """
+        seats = self._seat_counts(scenario)
+        return {self._parties[p]: seats[p] for p in range(len(self._parties))}
+
+    def seat_distribution(self, scenarios: List[Dict[str, float]]
+                          ) -> Dict[str, Dict[int, int]]:
+        """Return, for each party, how many of <scenarios> give it each
+        number of seats.
+
+        >>> from datetime import date
+        >>> e = ELECTIONS.Election(date(2015, 10, 19))
+        >>> e.update_results('r1', 'lib', 45)
+        >>> e.update_results('r1', 'pc', 55)
+        >>> projector = SwingProjector(e)
+        >>> projector.seat_distribution([{'lib': 0.2}, {'lib': 0.0},
+        ...                              {'pc': 0.1}]) == \\
+        ...     {'lib': {1: 1, 0: 2}, 'pc': {0: 1, 1: 2}}
+        True
+        """
+        distribution = {party: {} for party in self._parties}
+        for scenario in scenarios:
+            seats = self._seat_counts(scenario)
+            for p in range(len(self._parties)):
+                counts = distribution[self._parties[p]]
+                counts[seats[p]] = counts.get(seats[p], 0) + 1
+        return distribution
+
+    def simulate(self, mean_swing: Dict[str, float], sd: float, n: int,
+                 seed: int = 0) -> Dict[str, Dict[int, int]]:
+        """Return the seat distribution (see seat_distribution) of <n> random
+        scenarios, in which each party's swing is drawn from a normal
+        distribution with mean <mean_swing> for that party (or 0 if it is
+        not in <mean_swing>) and standard deviation <sd>.  The same <seed>
+        always gives the same scenarios.
+
+        >>> from datetime import date
+        >>> e = ELECTIONS.Election(date(2015, 10, 19))
+        >>> e.update_results('r1', 'lib', 45)
+        >>> e.update_results('r1', 'pc', 55)
+        >>> projector = SwingProjector(e)
+        >>> projector.simulate({'lib': 0.5}, 0.01, 100) == \\
+        ...     {'lib': {1: 100}, 'pc': {0: 100}}
+        True
+        """
+        rng = Random(seed)
+        scenarios = []
+        for _ in range(n):
+            scenarios.append({party: rng.gauss(mean_swing.get(party, 0.0), sd)
+                              for party in self._parties})
+        return self.seat_distribution(scenarios)
+
+
+class VotingSystem:
+    """An electoral system that decides how many seats each party wins, given
+    the results of an election.
+
+    This class is abstract and should not be directly instantiated.
+    """
+
+    def seats(self, election: ELECTIONS.Election) -> Dict[str, int]:
+        """Return the number of seats each party with votes in <election>
+        wins under this voting system.
+        """
+        raise NotImplementedError
+
+
+class FirstPastThePost(VotingSystem):
+    """The system used by Election.party_seats: each riding is won by the
+    party with the most votes in it, unless there is a tie.
+
+    === Sample Usage ===
+    >>> from datetime import date
+    >>> e = ELECTIONS.Election(date(2000, 2, 8))
+    >>> e.update_results('r1', 'ndp', 1)
+    >>> e.update_results('r1', 'lib', 2)
+    >>> FirstPastThePost().seats(e) == {'ndp': 0, 'lib': 1}
+    True
+    """
+
+    def seats(self, election: ELECTIONS.Election) -> Dict[str, int]:
+        """Return the number of ridings each party with votes in <election>
+        won outright.
+        """
+        return election.party_seats()
+
+
+class HighestAverages(VotingSystem):
+    """A proportional system that allocates a fixed number of seats to
+    parties by their popular vote, one seat at a time.
+
+    Each seat goes to the party with the highest quotient: its votes divided
+    by the divisor for the number of seats it has won so far.  Ties go to the
+    party with more votes, and then to the party recorded first.  The
+    quotients are kept in a heap, so allocating s seats among p parties takes
+    O(p + s log p) time.
+
+    This class is abstract and should not be directly instantiated; its
+    subclasses define the divisors.
+
+    === Public Attributes ===
+    total_seats:
+        the number of seats to allocate
+    """
+    total_seats: int
+
+    def __init__(self, total_seats: int) -> None:
+        """Initialize this system to allocate <total_seats> seats.
+        """
+        self.total_seats = total_seats
+
+    def divisor(self, seats_won: int) -> int:
+        """Return the divisor of the votes of a party that has already won
+        <seats_won> seats.
+        """
+        raise NotImplementedError
+
+    def seats(self, election: ELECTIONS.Election) -> Dict[str, int]:
+        """Return the number of seats each party with votes in <election>
+        wins, by its share of the popular vote.
+        """
+        popular_vote = election.popular_vote()
+        result = dict.fromkeys(popular_vote, 0)
+        if len(popular_vote) == 0:
+            return result
+        # Each entry is (-quotient, -votes, order recorded, party).
+        heap = [(-votes / self.divisor(0), -votes, order, party)
+                for order, (party, votes) in enumerate(popular_vote.items())]
+        heapify(heap)
+        for _ in range(self.total_seats):
+            entry = heappop(heap)
+            winner = entry[3]
+            result[winner] += 1
+            heappush(heap, (entry[1] / self.divisor(result[winner]),
+                            entry[1], entry[2], winner))
+        return result
+
+
+class DHondt(HighestAverages):
+    """The D'Hondt method, whose divisors are 1, 2, 3, ...
+
+    === Sample Usage ===
+    >>> from datetime import date
+    >>> e = ELECTIONS.Election(date(2000, 2, 8))
+    >>> for party, votes in [('a', 100000), ('b', 80000), ('c', 30000),
+    ...                      ('d', 20000)]:
+    ...     e.update_results('r1', party, votes)
+    >>> DHondt(8).seats(e) == {'a': 4, 'b': 3, 'c': 1, 'd': 0}
+    True
+    """
+
+    def divisor(self, seats_won: int) -> int:
+        """Return the divisor of the votes of a party that has already won
+        <seats_won> seats.
+        """
+        return seats_won + 1
+
+
+class SainteLague(HighestAverages):
+    """The Sainte-Laguë method, whose divisors are 1, 3, 5, ...
+
+    === Sample Usage ===
+    >>> from datetime import date
+    >>> e = ELECTIONS.Election(date(2000, 2, 8))
+    >>> for party, votes in [('a', 100000), ('b', 80000), ('c', 30000),
+    ...                      ('d', 20000)]:
+    ...     e.update_results('r1', party, votes)
+    >>> SainteLague(8).seats(e) == {'a': 3, 'b': 3, 'c': 1, 'd': 1}
+    True
+    """
+
+    def divisor(self, seats_won: int) -> int:
+        """Return the divisor of the votes of a party that has already won
+        <seats_won> seats.
+        """
+        return 2 * seats_won + 1
+
+
+class InstantRunoff(VotingSystem):
+    """Instant-runoff voting on ranked ballots in each riding.
+
+    The ballots of a riding are given as a table that maps each distinct
+    ranking of parties (most preferred first) to the number of ballots with
+    that ranking.  In each round, if the party with the most ballots has a
+    majority of the ballots that still rank a continuing party, it wins.
+    Otherwise the party with the fewest ballots is eliminated (ties for last
+    are broken by eliminating the party whose name sorts last), and only its
+    ballots move on to their next continuing choice.  So each ranking in the
+    table is examined once per party on it, however many rounds there are
+    and however many ballots share that ranking.
+
+    A riding where the last two parties finish tied is not won by either.
+
+    === Private Attributes ===
+    _ballots: the table of ballots for each riding.
+
+    === Sample Usage ===
+    >>> from datetime import date
+    >>> ballots = {'r1': {('lib', 'ndp'): 40, ('pc',): 45, ('ndp', 'lib'): 15},
+    ...            'r2': {('pc', 'lib'): 60, ('lib',): 40}}
+    >>> e = ELECTIONS.Election(date(2000, 2, 8))
+    >>> e.update_results('r1', 'lib', 40)
+    >>> e.update_results('r1', 'pc', 45)
+    >>> e.update_results('r1', 'ndp', 15)
+    >>> e.update_results('r2', 'pc', 60)
+    >>> e.update_results('r2', 'lib', 40)
+    >>> InstantRunoff(ballots).riding_winners('r1')
+    ['lib']
+    >>> InstantRunoff(ballots).seats(e) == {'lib': 1, 'pc': 1, 'ndp': 0}
+    True
+    """
+    _ballots: Dict[str, Dict[Tuple[str, ...], int]]
+
+    def __init__(self, ballots: Dict[str, Dict[Tuple[str, ...], int]]) -> None:
+        """Initialize this system with the table of <ballots> for each riding.
+        """
+        self._ballots = ballots
+
+    def riding_winners(self, riding: str) -> List[str]:
+        """Return the winner of <riding>, or the parties tied for the win.
+
+        Return the empty list if there are no ballots for <riding>.
+        """
+        # piles[party] holds (ranking, position, count) for the ballots whose
+        # current choice, ranking[position], is that party.
+        piles = {}
+        for ranking, count in self._ballots.get(riding, {}).items():
+            if len(ranking) > 0 and count > 0:
+                piles.setdefault(ranking[0], []).append((ranking, 0, count))
+                for choice in ranking:
+                    piles.setdefault(choice, [])
+        tallies = {party: sum(b[2] for b in pile)
+                   for party, pile in piles.items()}
+        while len(tallies) > 0:
+            continuing = sum(tallies.values())
+            leader = max(tallies, key=lambda q: tallies[q])
+            if 2 * tallies[leader] > continuing or len(tallies) == 1:
+                return [leader]
+            if len(tallies) == 2 and len(set(tallies.values())) == 1:
+                return sorted(tallies)
+            loser = min(tallies, key=lambda q: (tallies[q], _reverse_key(q)))
+            del tallies[loser]
+            for ranking, position, count in piles.pop(loser):
+                position += 1
+                while position < len(ranking) and \
+                        ranking[position] not in tallies:
+                    position += 1
+                if position < len(ranking):
+                    piles[ranking[position]].append((ranking, position, count))
+                    tallies[ranking[position]] += count
+        return []
+
+    def seats(self, election: ELECTIONS.Election) -> Dict[str, int]:
+        """Return the number of ridings of <election> each party wins outright
+        under instant-runoff voting.
+        """
+        result = {party: 0 for party in election.popular_vote()}
+        for riding in election.ridings_recorded():
+            winners = self.riding_winners(riding)
+            if len(winners) == 1:
+                result[winners[0]] = result.get(winners[0], 0) + 1
+        return result
+
+
+def _reverse_key(name: str) -> List[int]:
+    """Return a key that sorts strings in reverse order.
+
+    >>> sorted(['a', 'c', 'b'], key=_reverse_key)
+    ['c', 'b', 'a']
+    """
+    return [-ord(c) for c in name] + [1]
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'datetime', 'typing', 'heapq', 'operator',
+            'random', 'importlib'
+        ],
+        'max-attributes': 15
+    })
+
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,402 @@
+"""CSC148 Assignment 0: Election profiling and benchmarks
+
+=== Module description ===
+This module contains tools for measuring the performance of Election and
+Jurisdiction (from LingXin Li Python project1.py) and their subclasses:
+MethodProfiler, which times their methods as they are called, and
+run_benchmark, which times them on synthetic results made by
+write_synthetic_results.
+"""
+import csv
+import json
+import math
+import time
+import tracemalloc
+from functools import wraps
+from importlib import import_module
+from io import StringIO
+from random import Random
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+from election_compact import CompactJurisdiction
+
+# The module with Election and Jurisdiction.  Its file name has spaces, so it
+# can only be imported by name.
+ELECTIONS = import_module('LingXin Li Python project1')
+
+# The methods of Election, Jurisdiction and their subclasses that a
+# MethodProfiler times, and the most call durations it keeps for each method
+# to estimate percentiles from.
+PROFILED_METHODS = ['update_results', 'read_results', 'read_results_files',
+                    'merge_batch', 'results_for', 'riding_winners',
+                    'popular_vote', 'party_seats', 'election_winners',
+                    'party_wins', 'party_history', 'riding_changes']
+PROFILE_SAMPLES = 10000
+
+# The settings run_benchmark uses unless it is given others.
+BENCHMARK_CONFIG = {'ridings': 338, 'parties': 20, 'elections': 10,
+                    'rows': 100000, 'repeat': 10, 'seed': 0, 'compact': False}
+
+
+class MethodProfiler:
+    """Records how often the methods in PROFILED_METHODS are called on
+    elections and jurisdictions, how long they take, and how many rows of
+    results they process.
+
+    Profiling is off until enable is called.  Enabling wraps each profiled
+    method of Election, Jurisdiction and all their subclasses in a timer, and
+    disabling puts the original methods back, so there is no cost at all
+    while profiling is off.  Only one MethodProfiler should be enabled at a
+    time.
+
+    Rows are counted for the methods that ingest results: one for each call
+    to update_results, one for each (riding, party) tally merged by
+    merge_batch, and the number of csv rows read by Election.read_results.
+    Each row is counted once, for the outermost profiled call: a profiled
+    call made by another one passes its rows up to it, and a call that does
+    not count rows itself (such as Jurisdiction.read_results) reports the
+    rows of the calls it made.
+
+    === Private Attributes ===
+    _originals: the original function of each method that is wrapped, keyed
+        by the class it is defined in and its name.
+    _calls: the number of calls to each method, keyed by qualified name
+        (such as 'Election.popular_vote').
+    _seconds: the total time spent in each method.
+    _rows: the number of rows processed by each method.
+    _samples: a random sample of at most PROFILE_SAMPLES call durations of
+        each method.
+    _random: the random number generator used to sample durations.
+    _nested_rows: for each profiled call in progress, outermost first, the
+        rows processed by the profiled calls it has made so far.
+
+    === Sample Usage ===
+    >>> from datetime import date
+    >>> profiler = MethodProfiler()
+    >>> profiler.enable()
+    >>> e = ELECTIONS.Election(date(2000, 2, 8))
+    >>> e.update_results('r1', 'ndp', 1)
+    >>> e.update_results('r1', 'lib', 2)
+    >>> e.popular_vote() == {'ndp': 1, 'lib': 2}
+    True
+    >>> profiler.disable()
+    >>> e.update_results('r1', 'lib', 2)
+    >>> stats = profiler.snapshot()
+    >>> stats['Election.update_results']['calls']
+    2
+    >>> stats['Election.update_results']['rows']
+    2
+    >>> profiler.enable()
+    >>> j = ELECTIONS.Jurisdiction('Canada')
+    >>> j.read_results(2000, 2, 8, StringIO('h\\n,r1' + ',' * 12 + 'ndp,,,,5'))
+    >>> profiler.disable()
+    >>> stats = profiler.snapshot()
+    >>> stats['Jurisdiction.read_results']['rows']
+    1
+    >>> stats['Election.read_results']['rows']
+    0
+    >>> sorted(stats['Election.popular_vote'])
+    ['calls', 'mean_seconds', 'p99_seconds', 'rows', 'total_seconds']
+    """
+    _originals: Dict[Tuple[type, str], Callable]
+    _calls: Dict[str, int]
+    _seconds: Dict[str, float]
+    _rows: Dict[str, int]
+    _samples: Dict[str, List[float]]
+    _random: Random
+    _nested_rows: List[int]
+
+    def __init__(self) -> None:
+        """Initialize this profiler, which is not enabled and has recorded
+        no calls.
+        """
+        self._originals = {}
+        self._calls = {}
+        self._seconds = {}
+        self._rows = {}
+        self._samples = {}
+        self._random = Random(0)
+        self._nested_rows = []
+
+    def enable(self) -> None:
+        """Start timing the profiled methods of Election, Jurisdiction and
+        their subclasses.  Do nothing if this profiler is already enabled.
+        """
+        if len(self._originals) > 0:
+            return
+        to_visit = [ELECTIONS.Election, ELECTIONS.Jurisdiction]
+        while len(to_visit) > 0:
+            cls = to_visit.pop()
+            to_visit.extend(cls.__subclasses__())
+            for name in PROFILED_METHODS:
+                if name in vars(cls):
+                    function = vars(cls)[name]
+                    self._originals[(cls, name)] = function
+                    setattr(cls, name, self._wrap(function,
+                                                  cls.__name__ + '.' + name))
+
+    def disable(self) -> None:
+        """Stop timing methods, keeping what has been recorded so far.
+        """
+        for key, function in self._originals.items():
+            setattr(key[0], key[1], function)
+        self._originals = {}
+
+    def reset(self) -> None:
+        """Forget every call recorded so far.
+        """
+        self._calls = {}
+        self._seconds = {}
+        self._rows = {}
+        self._samples = {}
+
+    def _wrap(self, function: Callable, name: str) -> Callable:
+        """Return a version of <function> that records each of its calls
+        under <name>.
+        """
+        @wraps(function)
+        def timed(obj: object, *args: object, **kwargs: object) -> object:
+            self._nested_rows.append(0)
+            start = time.perf_counter()
+            try:
+                result = function(obj, *args, **kwargs)
+            except BaseException:
+                self._nested_rows.pop()
+                raise
+            seconds = time.perf_counter() - start
+            nested = self._nested_rows.pop()
+            rows = _rows_processed(obj, name, args)
+            if rows == 0:
+                rows = nested
+            if len(self._nested_rows) > 0:
+                self._nested_rows[-1] += rows
+                rows = 0
+            self._record(name, seconds, rows)
+            return result
+
+        return timed
+
+    def _record(self, name: str, seconds: float, rows: int) -> None:
+        """Record a call to the method <name> that took <seconds> and
+        processed <rows> rows.
+        """
+        calls = self._calls.get(name, 0) + 1
+        self._calls[name] = calls
+        self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+        self._rows[name] = self._rows.get(name, 0) + rows
+        samples = self._samples.setdefault(name, [])
+        if len(samples) < PROFILE_SAMPLES:
+            samples.append(seconds)
+        else:
+            i = self._random.randrange(calls)
+            if i < PROFILE_SAMPLES:
+                samples[i] = seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return, for each method that has been called, its number of calls,
+        the total and mean time spent in it, its 99th percentile call time
+        (estimated from a sample), and the number of rows it processed.
+        """
+        result = {}
+        for name in sorted(self._calls):
+            samples = sorted(self._samples[name])
+            result[name] = {
+                'calls': self._calls[name],
+                'total_seconds': self._seconds[name],
+                'mean_seconds': self._seconds[name] / self._calls[name],
+                'p99_seconds': samples[math.ceil(0.99 * len(samples)) - 1],
+                'rows': self._rows[name]
+            }
+        return result
+
+    def report(self) -> str:
+        """Return a table of the statistics in snapshot, with the methods
+        that took the most total time first.
+
+        >>> profiler = MethodProfiler()
+        >>> profiler.report().split()
+        ['method', 'calls', 'total', 's', 'p99', 'ms', 'rows']
+        """
+        lines = [f"{'method':<36}{'calls':>10}{'total s':>12}{'p99 ms':>10}"
+                 f"{'rows':>12}"]
+        stats = self.snapshot()
+        for name in sorted(stats, key=lambda n: -stats[n]['total_seconds']):
+            row = stats[name]
+            lines.append(f"{name:<36}{row['calls']:>10}"
+                         f"{row['total_seconds']:>12.4f}"
+                         f"{row['p99_seconds'] * 1000:>10.4f}{row['rows']:>12}")
+        return '\n'.join(lines)
+
+
+def _rows_processed(obj: object, name: str, args: tuple) -> int:
+    """Return the number of rows of results processed by a call to the method
+    <name> on <obj> with arguments <args>.
+    """
+    if name.endswith('.update_results'):
+        return 1
+    elif name.endswith('.merge_batch'):
+        return len(args[0])
+    elif name.endswith('.read_results') and isinstance(obj, ELECTIONS.Election):
+        return int(obj.ingest_stats()['rows'])
+    return 0
+
+
+def write_synthetic_results(output_stream: TextIO, ridings: int, parties: int,
+                            rows: int, seed: int = 0) -> None:
+    """Write <rows> rows of made-up poll results to <output_stream>, as a csv
+    file in the format defined in the A0 handout.
+
+    The results are spread over ridings named 'riding 0', 'riding 1', ...,
+    up to <ridings>, and parties named 'party 0', 'party 1', ..., up to
+    <parties>.  The same <seed> always gives the same results.
+
+    >>> from datetime import date
+    >>> output = StringIO()
+    >>> write_synthetic_results(output, 3, 2, 50, seed=1)
+    >>> e = ELECTIONS.Election(date(2000, 2, 8))
+    >>> e.read_results(StringIO(output.getvalue()))
+    >>> e.ingest_stats()['rows']
+    50
+    >>> sorted(e.ridings_recorded())
+    ['riding 0', 'riding 1', 'riding 2']
+    """
+    rng = Random(seed)
+    writer = csv.writer(output_stream)
+    header = ['column ' + str(i) for i in range(ELECTIONS.VOTES + 1)]
+    header[ELECTIONS.RIDING] = 'riding'
+    header[ELECTIONS.PARTY] = 'party'
+    header[ELECTIONS.VOTES] = 'votes'
+    writer.writerow(header)
+    row = [''] * (ELECTIONS.VOTES + 1)
+    for _ in range(rows):
+        row[ELECTIONS.RIDING] = 'riding ' + str(rng.randrange(ridings))
+        row[ELECTIONS.PARTY] = 'party ' + str(rng.randrange(parties))
+        row[ELECTIONS.VOTES] = str(rng.randint(1, 500))
+        writer.writerow(row)
+
+
+def _time_calls(function: Callable[[], object],
+                repeat: int) -> Dict[str, float]:
+    """Call <function> <repeat> + 1 times and return how long the first call
+    took, and the mean time of the rest, in seconds.
+    """
+    start = time.perf_counter()
+    function()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return {'first_call': first,
+            'per_call': (time.perf_counter() - start) / max(repeat, 1)}
+
+
+def run_benchmark(config: Optional[dict] = None) -> Dict[str, dict]:
+    """Time the main methods of Election and Jurisdiction on synthetic
+    results, and return the timings in a form that can be written as JSON.
+
+    <config> holds the settings that differ from BENCHMARK_CONFIG.  A
+    Jurisdiction is loaded with config['elections'] elections, each from a
+    file of config['rows'] rows over config['ridings'] ridings and
+    config['parties'] parties, made by write_synthetic_results with seeds
+    starting at config['seed'].  Each query method is then called
+    config['repeat'] + 1 times on the latest election (or, for
+    party_history, on the jurisdiction).  If config['compact'] is True, the
+    jurisdiction is a CompactJurisdiction, whose elections are
+    CompactElections.
+
+    The result has three keys: 'config' holds the settings used, 'timings'
+    holds the time in seconds of each method (see _time_calls; read_results
+    is the mean over all files, with its rate in rows per second), and
+    'memory' holds the size in bytes of memory allocated by loading the
+    jurisdiction, at the end and at its peak.
+
+    >>> result = run_benchmark({'ridings': 5, 'parties': 3, 'elections': 2,
+    ...                         'rows': 100, 'repeat': 1})
+    >>> sorted(result)
+    ['config', 'memory', 'timings']
+    >>> sorted(result['timings'])  # doctest: +NORMALIZE_WHITESPACE
+    ['election_winners', 'party_history', 'party_seats', 'popular_vote',
+     'read_results', 'riding_winners']
+    >>> json.loads(json.dumps(result))['config']['rows']
+    100
+    """
+    settings = dict(BENCHMARK_CONFIG)
+    settings.update(config or {})
+    files = []
+    for i in range(settings['elections']):
+        output = StringIO()
+        write_synthetic_results(output, settings['ridings'],
+                                settings['parties'], settings['rows'],
+                                settings['seed'] + i)
+        files.append(output.getvalue())
+
+    kind = CompactJurisdiction if settings['compact'] \
+        else ELECTIONS.Jurisdiction
+    start = time.perf_counter()
+    jurisdiction = _load_files(kind, files)
+    seconds = time.perf_counter() - start
+
+    # Tracing slows loading down, so memory is measured on a second load.
+    tracemalloc.start()
+    _load_files(kind, files)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = _time_queries(jurisdiction, settings['repeat'])
+    timings['read_results'] = {
+        'per_call': seconds / len(files),
+        'rows_per_second': settings['rows'] * len(files) / seconds
+        if seconds > 0 else 0.0
+    }
+    return {'config': settings, 'timings': timings,
+            'memory': {'current': current, 'peak': peak}}
+
+
+def _load_files(kind: type, files: List[str]) -> object:
+    """Return a new jurisdiction of class <kind> with one election read from
+    each csv file in <files>, on January 1 of the years 2000, 2001, ...
+    """
+    jurisdiction = kind('Synthetic')
+    for i in range(len(files)):
+        jurisdiction.read_results(2000 + i, 1, 1, StringIO(files[i]))
+    return jurisdiction
+
+
+def _time_queries(jurisdiction: object, repeat: int) -> Dict[str, dict]:
+    """Return the time in seconds of each query method on the latest
+    election in <jurisdiction>, and of party_history on <jurisdiction>,
+    each called <repeat> + 1 times (see _time_calls).
+
+    Precondition: <jurisdiction> has at least one election with results.
+    """
+    election = jurisdiction.election_on(jurisdiction.latest_elections(1)[0])
+    riding = election.ridings_recorded()[0]
+    return {
+        'popular_vote': _time_calls(election.popular_vote, repeat),
+        'party_seats': _time_calls(election.party_seats, repeat),
+        'riding_winners': _time_calls(
+            lambda: election.riding_winners(riding), repeat),
+        'election_winners': _time_calls(election.election_winners, repeat),
+        'party_history': _time_calls(
+            lambda: jurisdiction.party_history('party 0'), repeat)
+    }
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'datetime', 'typing', 'csv', 'json', 'math',
+            'time', 'tracemalloc', 'functools', 'io', 'random', 'importlib',
+            'election_compact'
+        ],
+        'max-attributes': 15
+    })
+
+    import doctest
+
+    doctest.testmod()
+
+    # An example of benchmarking Election on synthetic results.
+    print(json.dumps(run_benchmark(), indent=2))
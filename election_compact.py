@@ -0,0 +1,573 @@
+"""CSC148 Assignment 0: Compact elections and snapshot files
+
+=== Module description ===
+This module contains CompactElection, an Election (from
+LingXin Li Python project1.py) that stores its vote counts in arrays of
+integers, and CompactJurisdiction, a Jurisdiction of CompactElections.  It
+also contains the binary snapshot files that any Jurisdiction can be saved
+to, and loaded back from by memory-mapping the file, as CompactElections.
+"""
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date
+from importlib import import_module
+from typing import Any, Dict, List, Optional, Tuple
+
+# The module with Election and Jurisdiction.  Its file name has spaces, so it
+# can only be imported by name.
+ELECTIONS = import_module('LingXin Li Python project1')
+
+# The layout of a snapshot file (see save_snapshot).  The header
+# holds SNAPSHOT_MAGIC, SNAPSHOT_VERSION, the number of elections and a
+# CRC-32 checksum of everything after the header.
+SNAPSHOT_MAGIC = b'ELEC'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sHxxII')
+SNAPSHOT_ELECTION = struct.Struct('<iII')
+SNAPSHOT_LENGTH = struct.Struct('<I')
+
+
+class CompactElection(ELECTIONS.Election):
+    """An Election that stores its vote counts in arrays of integers instead
+    of nested dictionaries.
+
+    Riding and party names are each stored once and given an integer id (their
+    position in _ridings and _parties), and the vote counts form a dense
+    ridings x parties table of machine integers, stored one column per party.
+    Each riding keeps only its most votes and the party that has them, as
+    integers; its winners and ranking are worked out from its row of the
+    table when they are needed.  This uses much less memory than Election for
+    national-scale data, and has the same public interface.
+
+    When ridings are tied, riding_winners lists the tied parties in the order
+    they were first recorded in this election, rather than in this riding.
+
+    === Private Attributes ===
+    _riding_ids: the position of each riding in _ridings.
+    _columns: the vote counts for this election.  _columns[p][r] is the
+        number of votes earned by party _parties[p] in riding _ridings[r].
+        The columns of an election loaded from a snapshot are read-only
+        memoryviews of the snapshot file until it is first updated, or the
+        snapshot is closed.
+    _top_votes: the most votes of any party in each riding, indexed like
+        _ridings.
+    _leader_ids: the id of the only party with _top_votes in each riding,
+        or -1 if several parties have them, indexed like _ridings.
+    _riding_versions: the version of this election in which the results of
+        each riding last changed, indexed like _ridings.  The change log
+        only records the parties that changed.
+
+    === Representation Invariants ==
+    - self._results == {}, self._leaders == {} and self._rankings == {}
+    - len(self._columns) == len(self._parties)
+    - For every column in self._columns, len(column) == len(self._ridings)
+    - _top_votes, _leader_ids and _riding_versions have one entry per riding
+
+    === Sample Usage ===
+    >>> e = CompactElection(date(2000, 2, 8))
+    >>> e.update_results('r1', 'ndp', 1234)
+    >>> e.update_results('r1', 'lib', 1345)
+    >>> e.update_results('r2', 'pc', 1)
+    >>> e.results_for('r1', 'lib')
+    1345
+    >>> e.results_for('r2', 'ndp') is None
+    True
+    >>> e.party_seats() == {'ndp': 0, 'lib': 1, 'pc': 1}
+    True
+    """
+    _riding_ids: Dict[str, int]
+    _columns: list
+    _top_votes: array
+    _leader_ids: array
+    _riding_versions: array
+
+    def __init__(self, d: date) -> None:
+        """Initialize a new election on date d and with no ridings, parties,
+        or votes recorded so far.
+
+        >>> e = CompactElection(date(2000, 2, 8))
+        >>> e._columns
+        []
+        """
+        ELECTIONS.Election.__init__(self, d)
+        self._riding_ids = {}
+        self._columns = []
+        self._top_votes = array('q')
+        self._leader_ids = array('q')
+        self._riding_versions = array('q')
+
+    def _add_party(self, party: str) -> None:
+        """Record that <party> has votes in this election, with a column of
+        zero votes in every riding.
+
+        Precondition: <party> is not already recorded in this election, and
+        its columns are writable (see make_writable).
+        """
+        ELECTIONS.Election._add_party(self, party)
+        self._columns.append(array('q', [0]) * len(self._ridings))
+
+    def _add_riding(self, riding: str) -> None:
+        """Record that <riding> has votes in this election, with zero votes
+        for every party.
+
+        Precondition: <riding> is not already recorded in this election, and
+        its columns are writable (see make_writable).
+        """
+        self._riding_ids[riding] = len(self._ridings)
+        self._ridings.append(riding)
+        self._top_votes.append(0)
+        self._leader_ids.append(-1)
+        self._riding_versions.append(0)
+        for column in self._columns:
+            column.append(0)
+
+    def make_writable(self) -> None:
+        """Copy the columns of this election into arrays, if they are still
+        memoryviews of a snapshot file, so that they can be updated and the
+        file can be closed.
+
+        The columns are all memoryviews or all arrays, so this only checks
+        the first one unless they need copying.
+        """
+        if len(self._columns) > 0 and \
+                isinstance(self._columns[0], memoryview):
+            self._columns = [array('q', column) for column in self._columns]
+
+    def _count_votes(self, r: int, p: int, votes: int,
+                     changed: Dict[str, None]) -> None:
+        """Add <votes> to the votes of the party with id <p> in the riding
+        with id <r>, and update the riding's leader and the seats.  Add the
+        parties whose popular vote or seats changed to <changed>.
+
+        Votes only increase, so a party with more than _top_votes leads the
+        riding outright, and one that reaches _top_votes ties for the lead.
+
+        Precondition: votes >= 1, and the columns are writable.
+        """
+        column = self._columns[p]
+        total = column[r] + votes
+        column[r] = total
+        self._totals[self._parties[p]] += votes
+        changed[self._parties[p]] = None
+        leader = self._leader_ids[r]
+        if total > self._top_votes[r]:
+            self._top_votes[r] = total
+            if leader != p:
+                self._leader_ids[r] = p
+                self._seats[self._parties[p]] += 1
+        elif total == self._top_votes[r]:
+            self._leader_ids[r] = -1
+        else:
+            return
+        if 0 <= leader != p:
+            self._seats[self._parties[leader]] -= 1
+            changed[self._parties[leader]] = None
+
+    def update_results(self, riding: str, party: str, votes: int) -> None:
+        """Update this election to reflect that in <riding>, <party> received
+        <votes> additional votes.
+
+        Precondition: votes >= 1
+
+        >>> e = CompactElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 2)
+        >>> e.update_results('r1', 'lib', 2)
+        >>> e.party_seats() == {'ndp': 0, 'lib': 0}
+        True
+        >>> e.update_results('r1', 'lib', 1)
+        >>> e.party_seats() == {'ndp': 0, 'lib': 1}
+        True
+        """
+        self._start_update()
+        self.make_writable()
+        if party not in self._party_ids:
+            self._add_party(party)
+        if riding not in self._riding_ids:
+            self._add_riding(riding)
+        r = self._riding_ids[riding]
+        changed = {}
+        self._count_votes(r, self._party_ids[party], votes, changed)
+        self._riding_versions[r] = self.version()
+        self._log_change(None, list(changed))
+
+    def _merge_lines(self, lines: List[str]) -> None:
+        """Add the votes in <lines>, rows of a csv file in the format defined
+        in the A0 handout, to this election.
+
+        The votes are merged as one batch, so no ridings are left in
+        _unranked.
+        """
+        self.merge_batch(ELECTIONS.tally_lines(lines))
+
+    def merge_batch(self, batch: Dict[Tuple[str, str], int]) -> None:
+        """Merge <batch> into this election.
+
+        Each key in <batch> is a (riding, party) pair, and its value is the
+        number of additional votes that party received in that riding.  The
+        leader and seat of each riding are updated as each vote is added.
+
+        Precondition: every value in <batch> is at least 1.
+
+        >>> e = CompactElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 5)
+        >>> e.merge_batch({('r1', 'lib'): 7, ('r2', 'pc'): 1,
+        ...                 ('r1', 'ndp'): 2})
+        >>> e.riding_winners('r1')
+        ['ndp', 'lib']
+        >>> e.party_seats() == {'ndp': 0, 'lib': 0, 'pc': 1}
+        True
+        """
+        if len(batch) == 0:
+            return
+        self._start_update()
+        self.make_writable()
+        version = self.version()
+        changed = {}
+        for key, votes in batch.items():
+            riding, party = key
+            if riding not in self._riding_ids:
+                self._add_riding(riding)
+            if party not in self._party_ids:
+                self._add_party(party)
+            r = self._riding_ids[riding]
+            self._count_votes(r, self._party_ids[party], votes, changed)
+            self._riding_versions[r] = version
+        self._log_change(None, list(changed))
+
+    def load_columns(self, ridings: List[str], parties: List[str],
+                     columns: list) -> None:
+        """Record <columns>, the votes of each party in <parties> in each
+        riding in <ridings>, as the results of this election, and compute its
+        popular vote and seats.
+
+        <columns> holds one column of votes per party, as in _columns.  The
+        columns may all be arrays or all be memoryviews of integers; the
+        memoryviews are only copied if this election is updated.
+
+        Precondition: no results have been recorded in this election.
+
+        >>> e = CompactElection(date(2000, 2, 8))
+        >>> e.load_columns(['r1', 'r2'], ['ndp', 'lib'],
+        ...                [array('q', [3, 0]), array('q', [2, 5])])
+        >>> e.popular_vote() == {'ndp': 3, 'lib': 7}
+        True
+        >>> e.party_seats() == {'ndp': 1, 'lib': 1}
+        True
+        """
+        self._start_update()
+        for party in parties:
+            ELECTIONS.Election._add_party(self, party)
+        for riding in ridings:
+            self._riding_ids[riding] = len(self._ridings)
+            self._ridings.append(riding)
+        self._riding_versions = array('q', [self.version()]) * len(ridings)
+        self._top_votes = array('q', [0]) * len(ridings)
+        self._leader_ids = array('q', [-1]) * len(ridings)
+        self._columns = columns
+        for p, column in enumerate(columns):
+            self._totals[parties[p]] = sum(column)
+            for r, votes in enumerate(column):
+                if votes > self._top_votes[r]:
+                    self._top_votes[r], self._leader_ids[r] = votes, p
+                elif votes == self._top_votes[r]:
+                    self._leader_ids[r] = -1
+        for leader in self._leader_ids:
+            if leader >= 0:
+                self._seats[parties[leader]] += 1
+        self._log_change(None, parties)
+
+    def changes_since(self, version: int) -> dict:
+        """Return what has changed in this election since <version>, as
+        Election.changes_since does.
+
+        The ridings that changed are found by checking the version of every
+        riding, so this takes time proportional to the number of ridings.
+
+        >>> e = CompactElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 3)
+        >>> e.update_results('r2', 'lib', 2)
+        >>> v = e.version()
+        >>> e.update_results('r1', 'lib', 4)
+        >>> e.changes_since(v) == {'version': 3,
+        ...                        'ridings': {'r1': {'ndp': 3, 'lib': 4}},
+        ...                        'popular_vote': {'ndp': 3, 'lib': 6},
+        ...                        'seats': {'ndp': 0, 'lib': 2}}
+        True
+        """
+        changes = ELECTIONS.Election.changes_since(self, version)
+        if version < self.version():
+            for r, changed in enumerate(self._riding_versions):
+                if changed > version:
+                    riding = self._ridings[r]
+                    changes['ridings'][riding] = self._riding_results(riding)
+        return changes
+
+    def riding_winners(self, riding: str) -> List[str]:
+        """Return the winners, in <riding>, of this election, in the order
+        they were first recorded in this election.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+
+        >>> e = CompactElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r1', 'lib', 2)
+        >>> e.riding_winners('r1')
+        ['lib']
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.riding_winners('r1')
+        ['ndp', 'lib']
+        """
+        r = self._riding_ids[riding]
+        if self._leader_ids[r] >= 0:
+            return [self._parties[self._leader_ids[r]]]
+        return [self._parties[p] for p, column in enumerate(self._columns)
+                if column[r] == self._top_votes[r]]
+
+    def _riding_results(self, riding: str) -> Dict[str, int]:
+        """Return the number of votes of each party with at least one vote in
+        <riding>.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        r = self._riding_ids[riding]
+        result = {}
+        for p, column in enumerate(self._columns):
+            if column[r] > 0:
+                result[self._parties[p]] = column[r]
+        return result
+
+    def results_for(self, riding: str, party: str) -> Optional[int]:
+        """Return the number of votes received in <riding> by <party> in
+        this election.
+
+        Return None if <riding> does not have any votes recorded in this
+        election, or if it does, but <party> does not have any votes recorded
+        in this riding in this election.
+
+        >>> e = CompactElection(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1234)
+        >>> e.update_results('r2', 'pc', 1)
+        >>> e.results_for('r1', 'ndp')
+        1234
+        >>> e.results_for('r1', 'pc') is None
+        True
+        """
+        if riding not in self._riding_ids or party not in self._party_ids:
+            return None
+        votes = self._columns[self._party_ids[party]][self._riding_ids[riding]]
+        if votes == 0:
+            return None
+        return votes
+
+
+class CompactJurisdiction(ELECTIONS.Jurisdiction):
+    """A Jurisdiction whose elections are CompactElections.
+
+    Like any Jurisdiction, it can be saved to a snapshot file and loaded back
+    from it (see ElectionHistory.save and ElectionHistory.load).
+
+    === Sample Usage ===
+    >>> import io
+    >>> from election_benchmark import write_synthetic_results
+    >>> results = io.StringIO()
+    >>> write_synthetic_results(results, 20, 3, 200)
+    >>> j = CompactJurisdiction('Canada')
+    >>> j.read_results(2000, 2, 8, io.StringIO(results.getvalue()))
+    >>> in_memory = ELECTIONS.Jurisdiction('Canada')
+    >>> in_memory.read_results(2000, 2, 8, io.StringIO(results.getvalue()))
+    >>> j.party_history('party 0') == in_memory.party_history('party 0')
+    True
+    """
+
+    def _new_election(self, d: date) -> CompactElection:
+        """Return a new election on date <d> with no results, to be recorded
+        in this jurisdiction.
+        """
+        return CompactElection(d)
+
+
+def save_snapshot(elections: Dict[date, Any], path: str) -> None:
+    """Write <elections>, any elections by date, to a snapshot file at
+    <path>, which can be read back with Snapshot.
+
+    The file starts with a header holding SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+    the number of elections and a CRC-32 checksum of the rest of the file.
+    Then, for each election, it holds the date, the riding and party names,
+    and a column of 64-bit little-endian vote counts for each party, aligned
+    to 8 bytes.
+    """
+    body = bytearray()
+    for d, election in elections.items():
+        ridings = election.ridings_recorded()
+        parties = list(election.popular_vote())
+        body += SNAPSHOT_ELECTION.pack(d.toordinal(), len(ridings),
+                                       len(parties))
+        for name in ridings + parties:
+            encoded = name.encode('utf-8')
+            body += SNAPSHOT_LENGTH.pack(len(encoded)) + encoded
+        body += bytes(-(SNAPSHOT_HEADER.size + len(body)) % 8)
+        for party in parties:
+            column = array('q', [election.results_for(riding, party) or 0
+                                 for riding in ridings])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            body += column.tobytes()
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                  len(elections), zlib.crc32(body))
+    with open(path, 'wb') as output_stream:
+        output_stream.write(header)
+        output_stream.write(body)
+
+
+class Snapshot:
+    """The elections in a snapshot file written by save_snapshot, read by
+    memory-mapping the file.
+
+    Each election is a CompactElection whose vote counts are read directly
+    from the mapped pages, so loading is fast and several processes that
+    load the same file share its memory.  An election's counts are only
+    copied if it is updated, or when the snapshot is closed.
+
+    A snapshot only holds vote counts, so tied parties are listed by
+    riding_winners in the order of CompactElection (the order they were first
+    recorded in the election).  This is the order they had when saved, unless
+    the elections saved were not CompactElections.
+
+    === Public Attributes ===
+    elections:
+        the elections in the snapshot file, by date
+
+    === Private Attributes ===
+    _mapped: the memory-mapped snapshot file, or None once it is closed.
+
+    === Sample Usage ===
+    >>> import os, tempfile
+    >>> e = CompactElection(date(2000, 2, 8))
+    >>> e.update_results('r1', 'ndp', 1)
+    >>> e.update_results('r1', 'lib', 1)
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     path = os.path.join(folder, 'canada.snap')
+    ...     save_snapshot({date(2000, 2, 8): e}, path)
+    ...     snapshot = Snapshot(path)
+    ...     snapshot.elections[date(2000, 2, 8)].riding_winners('r1')
+    ...     snapshot.close()
+    ['ndp', 'lib']
+    >>> snapshot.elections[date(2000, 2, 8)].results_for('r1', 'lib')
+    1
+    """
+    elections: Dict[date, CompactElection]
+    _mapped: Optional[mmap.mmap]
+
+    def __init__(self, path: str) -> None:
+        """Open the snapshot file at <path> and read the elections in it.
+
+        Raise ValueError if the file is not a snapshot of this version, or
+        its checksum does not match its contents.
+
+        >>> import os, tempfile
+        >>> with tempfile.TemporaryDirectory() as folder:  # doctest: +ELLIPSIS
+        ...     path = os.path.join(folder, 'short.snap')
+        ...     with open(path, 'wb') as output_stream:
+        ...         _ = output_stream.write(SNAPSHOT_MAGIC)
+        ...     _ = Snapshot(path)
+        Traceback (most recent call last):
+        ValueError: ... is not a version 1 snapshot
+        """
+        with open(path, 'rb') as input_stream:
+            self._mapped = mmap.mmap(input_stream.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        self.elections = {}
+        view = memoryview(self._mapped)
+        try:
+            count = _check_header(view, path)
+        except ValueError:
+            view.release()
+            self.close()
+            raise
+        offset = SNAPSHOT_HEADER.size
+        for _ in range(count):
+            d, election, offset = _read_election(view, offset)
+            self.elections[d] = election
+
+    def close(self) -> None:
+        """Copy the vote counts that are still read from the snapshot file
+        into memory, and close the file.  The elections can still be used.
+        """
+        if self._mapped is None:
+            return
+        for election in self.elections.values():
+            election.make_writable()
+        self._mapped.close()
+        self._mapped = None
+
+
+def _check_header(view: memoryview, path: str) -> int:
+    """Return the number of elections in <view>, the contents of the snapshot
+    file at <path>.
+
+    Raise ValueError if <view> is not a snapshot of this version, or its
+    checksum does not match its contents.
+    """
+    if len(view) < SNAPSHOT_HEADER.size:
+        raise ValueError(path + ' is not a version '
+                         + str(SNAPSHOT_VERSION) + ' snapshot')
+    magic, version, count, checksum = SNAPSHOT_HEADER.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(path + ' is not a version '
+                         + str(SNAPSHOT_VERSION) + ' snapshot')
+    if zlib.crc32(view[SNAPSHOT_HEADER.size:]) != checksum:
+        raise ValueError(path + ' is corrupt: its checksum does not match')
+    return count
+
+
+def _read_election(view: memoryview,
+                   offset: int) -> Tuple[date, CompactElection, int]:
+    """Return the date and results of the election stored at <offset> in
+    <view>, the contents of a snapshot file, and the offset just after it.
+
+    The vote counts of the election are memoryviews of <view>, unless this
+    machine is big-endian.
+    """
+    ordinal, n_ridings, n_parties = SNAPSHOT_ELECTION.unpack_from(view, offset)
+    offset += SNAPSHOT_ELECTION.size
+    names = []
+    for _ in range(n_ridings + n_parties):
+        length = SNAPSHOT_LENGTH.unpack_from(view, offset)[0]
+        offset += SNAPSHOT_LENGTH.size
+        names.append(bytes(view[offset:offset + length]).decode('utf-8'))
+        offset += length
+    offset += -offset % 8
+    columns = []
+    for _ in range(n_parties):
+        end = offset + 8 * n_ridings
+        if sys.byteorder == 'big':
+            swapped = array('q', bytes(view[offset:end]))
+            swapped.byteswap()
+            columns.append(swapped)
+        else:
+            columns.append(view[offset:end].cast('q'))
+        offset = end
+    d = date.fromordinal(ordinal)
+    election = CompactElection(d)
+    election.load_columns(names[:n_ridings], names[n_ridings:], columns)
+    return d, election, offset
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-io': ['save_snapshot', 'Snapshot.__init__'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'datetime', 'typing', 'array', 'mmap',
+            'struct', 'sys', 'zlib', 'importlib'
+        ],
+        'max-attributes': 15
+    })
+
+    import doctest
+
+    doctest.testmod()
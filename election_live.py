@@ -0,0 +1,240 @@
+"""CSC148 Assignment 0: Live election results
+
+=== Module description ===
+This module contains LiveResults, an asyncio service that applies a live feed
+of vote updates to an Election (from LingXin Li Python project1.py) and
+publishes snapshots of its standings, for election night.
+"""
+import asyncio
+import csv
+from importlib import import_module
+from typing import Callable, Dict, Optional, Tuple
+
+# The module with Election and Jurisdiction.  Its file name has spaces, so it
+# can only be imported by name.
+ELECTIONS = import_module('LingXin Li Python project1')
+
+
+class LiveResults:
+    """A service that applies a live feed of vote updates to an election and
+    publishes snapshots of its standings, for election night.
+
+    Each update in the feed is one line of text: a riding, a party and a
+    number of additional votes, separated by commas (and quoted as in a csv
+    file if needed).  Lines that are not in this form, or whose number of
+    votes is not a whole number of at least 1, are skipped and counted in
+    rejected.  Updates are tallied and applied to the election in
+    batches of at most batch_size lines, or whenever interval seconds pass
+    without a full batch.  Independently, a snapshot of the standings is
+    passed to the publish function every interval seconds; since the
+    standings are kept up to date by Election.update_results, taking a
+    snapshot does not hold up ingestion.
+
+    === Public Attributes ===
+    election:
+        the election that updates are applied to
+    batch_size:
+        the largest number of updates applied to the election at once
+    interval:
+        the number of seconds between published snapshots
+    updates:
+        the number of updates applied to the election so far
+    rejected:
+        the number of lines skipped because they were not valid updates
+
+    === Private Attributes ===
+    _publish: the function that each snapshot is passed to.
+    _pending: updates that have been read but not yet applied, tallied by
+        (riding, party).
+    _pending_rows: the number of updates in _pending.
+    _stopped: set when the service has been asked to stop.
+
+    === Sample Usage ===
+    >>> from datetime import date
+    >>> snapshots = []
+    >>> election = ELECTIONS.Election(date(2015, 10, 19))
+    >>> service = LiveResults(election, snapshots.append)
+    >>> async def demo():
+    ...     feed = asyncio.StreamReader()
+    ...     feed.feed_data(b'r1,ndp,10\\n"r1",lib,4\\nr2,lib,3\\nr1,lib,7\\n'
+    ...                    b'r1,ndp,0\\nr1,ndp,-5\\nr1,ndp\\nr2,pc,lots\\n')
+    ...     feed.feed_eof()
+    ...     await service.consume(feed)
+    ...     service.publish_now()
+    >>> asyncio.run(demo())
+    >>> service.updates
+    4
+    >>> service.rejected
+    4
+    >>> snapshots[-1] == {'version': 1, 'popular_vote': {'ndp': 10, 'lib': 14},
+    ...                   'seats': {'ndp': 0, 'lib': 2}}
+    True
+    """
+    election: ELECTIONS.Election
+    batch_size: int
+    interval: float
+    updates: int
+    rejected: int
+    _publish: Callable[[dict], object]
+    _pending: Dict[Tuple[str, str], int]
+    _pending_rows: int
+    _stopped: asyncio.Event
+
+    def __init__(self, election: ELECTIONS.Election,
+                 publish: Callable[[dict], object],
+                 batch_size: int = 1000, interval: float = 1.0) -> None:
+        """Initialize this service to apply updates to <election> and pass
+        snapshots to <publish>, with the given <batch_size> and <interval>.
+        """
+        self.election = election
+        self.batch_size = batch_size
+        self.interval = interval
+        self.updates = 0
+        self.rejected = 0
+        self._publish = publish
+        self._pending = {}
+        self._pending_rows = 0
+        self._stopped = asyncio.Event()
+
+    def snapshot(self) -> dict:
+        """Return the current standings of this service's election: its
+        version (see Election.update_results), popular vote and seats.
+        """
+        return {'version': self.election.version(),
+                'popular_vote': self.election.popular_vote(),
+                'seats': self.election.party_seats()}
+
+    def publish_now(self) -> None:
+        """Pass a snapshot of the current standings to the publish function.
+        """
+        self._publish(self.snapshot())
+
+    def stop(self) -> None:
+        """Ask this service to stop tailing files and publishing snapshots.
+        """
+        self._stopped.set()
+
+    def _add_line(self, line: bytes) -> None:
+        """Tally the update in <line>, and apply all pending updates if there
+        are now batch_size of them.  Ignore blank lines, and skip and count
+        lines that are not valid updates.
+        """
+        if line.strip() == b'':
+            return
+        update = _parse_update(line)
+        if update is None:
+            self.rejected += 1
+            return
+        key = (update[0], update[1])
+        self._pending[key] = self._pending.get(key, 0) + update[2]
+        self._pending_rows += 1
+        if self._pending_rows >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Apply all pending updates to this service's election.
+        """
+        if self._pending_rows > 0:
+            self.election.merge_batch(self._pending)
+            self.updates += self._pending_rows
+            self._pending = {}
+            self._pending_rows = 0
+
+    async def consume(self, reader: asyncio.StreamReader) -> None:
+        """Apply every update read from <reader> until it reaches the end of
+        its stream.
+        """
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(), self.interval)
+            except asyncio.TimeoutError:
+                self._flush()
+                continue
+            if line == b'':
+                break
+            self._add_line(line)
+            if self._pending_rows == 0:
+                # Let the publisher run between batches.
+                await asyncio.sleep(0)
+        self._flush()
+
+    async def serve(self, host: str = '127.0.0.1',
+                    port: int = 0) -> asyncio.AbstractServer:
+        """Start accepting connections on <host> and <port>, and apply every
+        update sent on each connection.  Return the server.
+        """
+        async def handle(reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter) -> None:
+            try:
+                await self.consume(reader)
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+    async def tail(self, path: str) -> None:
+        """Apply every update in the file at <path>, including lines appended
+        to it later, until this service is stopped.
+        """
+        with open(path, 'rb') as input_stream:
+            while not self._stopped.is_set():
+                line = input_stream.readline()
+                if line.endswith(b'\n'):
+                    self._add_line(line)
+                else:
+                    # Wait for the rest of a partly written line.
+                    input_stream.seek(-len(line), 1)
+                    self._flush()
+                    await asyncio.sleep(self.interval / 10)
+                if self._pending_rows == 0:
+                    await asyncio.sleep(0)
+        self._flush()
+
+    async def publish_snapshots(self) -> None:
+        """Publish a snapshot every interval seconds until this service is
+        stopped, and once more when it stops.
+        """
+        while not self._stopped.is_set():
+            self.publish_now()
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+        self.publish_now()
+
+
+def _parse_update(line: bytes) -> Optional[Tuple[str, str, int]]:
+    """Return the riding, party and number of votes of the update in <line>,
+    or None if <line> is not a valid update.
+
+    >>> _parse_update(b'"Toronto, Centre",ndp,10\\n')
+    ('Toronto, Centre', 'ndp', 10)
+    >>> _parse_update(b'r1,ndp,0\\n') is None
+    True
+    >>> _parse_update(b'r1,ndp,10,extra\\n') is None
+    True
+    """
+    try:
+        row = next(csv.reader([line.decode('utf-8')]))
+        if len(row) == 3 and int(row[2]) >= 1:
+            return (row[0], row[1], int(row[2]))
+    except (UnicodeDecodeError, csv.Error, ValueError, StopIteration):
+        pass
+    return None
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-io': ['LiveResults.tail'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'datetime', 'typing', 'asyncio', 'csv',
+            'importlib'
+        ],
+        'max-attributes': 15
+    })
+
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,626 @@
+"""CSC148 Assignment 0: Election and Jurisdiction queries
+
+=== Module description ===
+This module contains the queries that Election and Jurisdiction (in
+LingXin Li Python project1.py) inherit: the rankings of the parties in each
+riding of an election, and the date index and cross-election tables of a
+jurisdiction.  It also contains ChangeLog, which an Election uses to record
+what changed in each of its versions, and VersionedDict, which a jurisdiction
+keeps its elections in so it can tell when they change.  They only depend
+on a few methods and attributes that those classes provide, so they are kept
+here to keep that module to a manageable size.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date
+from heapq import nsmallest
+from importlib import import_module
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class RankedResults:
+    """The results of an election, ranked by votes in each riding.
+
+    This class is abstract and should not be directly instantiated; its
+    subclasses record the ridings of an election and their results.
+
+    === Sample Usage ===
+    >>> from importlib import import_module
+    >>> Election = import_module('LingXin Li Python project1').Election
+    >>> e = Election(date(2000, 2, 8))
+    >>> e.update_results('r1', 'ndp', 3)
+    >>> e.update_results('r1', 'lib', 5)
+    >>> e.top_parties('r1', 1)
+    [('lib', 5)]
+    """
+
+    def ridings_recorded(self) -> List[str]:
+        """Return the ridings in which votes have been recorded in this
+        election.
+        """
+        raise NotImplementedError
+
+    def _riding_results(self, riding: str) -> Dict[str, int]:
+        """Return the number of votes of each party with at least one vote in
+        <riding>.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        raise NotImplementedError
+
+    def _ranked_results(self, riding: str
+                        ) -> Tuple[List[str], Dict[str, int]]:
+        """Return the parties with votes in <riding>, from most votes to
+        fewest, along with the results of <riding> (see _riding_results).
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        party_data = self._riding_results(riding)
+        return sorted(party_data, key=lambda p: -party_data[p]), party_data
+
+    def _visit_ranked_ridings(self, visit: Callable[
+            [str, List[str], Dict[str, int]], None]) -> None:
+        """Call <visit> on each riding in ridings_recorded with its ranking and
+        results (see _ranked_results).
+        """
+        for riding in self.ridings_recorded():
+            ranking, party_data = self._ranked_results(riding)
+            visit(riding, ranking, party_data)
+
+    def top_parties(self, riding: str, k: int) -> List[Tuple[str, int]]:
+        """Return the <k> parties with the most votes in <riding>, with their
+        votes, from most votes to fewest.  Include every party tied with the
+        k'th party, so the result may be longer than <k>.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+
+        >>> from importlib import import_module
+        >>> Election = import_module('LingXin Li Python project1').Election
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 3)
+        >>> e.update_results('r1', 'lib', 5)
+        >>> e.update_results('r1', 'pc', 3)
+        >>> e.update_results('r1', 'green', 1)
+        >>> e.top_parties('r1', 2)
+        [('lib', 5), ('ndp', 3), ('pc', 3)]
+        """
+        ranking, party_data = self._ranked_results(riding)
+        result = []
+        for party in ranking:
+            votes = party_data[party]
+            if len(result) >= k and votes < result[-1][1]:
+                break
+            result.append((party, votes))
+        return result
+
+    def riding_margins(self) -> Dict[str, Tuple[List[str], List[str], int]]:
+        """Return, for each riding, its winners, its runners-up and the margin
+        of victory.
+
+        The winners are the party or parties with the most votes.  The
+        runners-up are the party or parties with the next highest number of
+        votes (or none, if every party is a winner).  The margin is the
+        difference between the votes of the first and second parties in the
+        riding; it is 0 if the winners are tied, and the winner's votes if
+        the winner is the only party.
+
+        >>> from importlib import import_module
+        >>> Election = import_module('LingXin Li Python project1').Election
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 3)
+        >>> e.update_results('r1', 'lib', 5)
+        >>> e.update_results('r1', 'pc', 3)
+        >>> e.update_results('r2', 'pc', 4)
+        >>> e.update_results('r2', 'ndp', 4)
+        >>> e.riding_margins() == {'r1': (['lib'], ['ndp', 'pc'], 2),
+        ...                        'r2': (['pc', 'ndp'], [], 0)}
+        True
+        """
+        margins = {}
+
+        def add_margin(riding: str, ranking: List[str],
+                       party_data: Dict[str, int]) -> None:
+            votes = [party_data[party] for party in ranking]
+            i = 1
+            while i < len(ranking) and votes[i] == votes[0]:
+                i += 1
+            j = i + 1
+            while j < len(ranking) and votes[j] == votes[i]:
+                j += 1
+            margin = votes[0] - votes[1] if len(votes) > 1 else votes[0]
+            margins[riding] = (ranking[:i], ranking[i:j], margin)
+
+        self._visit_ranked_ridings(add_margin)
+        return margins
+
+    def closest_races(self, n: int) -> List[Tuple[str, int]]:
+        """Return the <n> ridings with the smallest margins of victory (see
+        riding_margins), with their margins, from closest to least close.
+
+        >>> from importlib import import_module
+        >>> Election = import_module('LingXin Li Python project1').Election
+        >>> e = Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 3)
+        >>> e.update_results('r1', 'lib', 5)
+        >>> e.update_results('r2', 'pc', 9)
+        >>> e.update_results('r2', 'ndp', 8)
+        >>> e.update_results('r3', 'pc', 1)
+        >>> e.closest_races(2)
+        [('r2', 1), ('r3', 1)]
+        """
+        margins = self.riding_margins()
+        return nsmallest(n, ((riding, margins[riding][2])
+                             for riding in margins), key=lambda m: m[1])
+
+
+class ChangeLog:
+    """The version of an election, and the version in which each of its
+    ridings and parties last changed.
+
+    Each change is logged under a kind and a name: ('riding', r) when the
+    results of riding r change, ('party', p) when the popular vote or seats
+    of party p change, and ('seats', '') when the seats of any party may
+    have changed, for elections that do not track which ones did.
+
+    === Public Attributes ===
+    version:
+        the number of times the results of the election have changed
+
+    === Private Attributes ===
+    _changed: the version in which each (kind, name) last changed, from
+        least to most recently changed.
+
+    === Sample Usage ===
+    >>> log = ChangeLog()
+    >>> log.advance()
+    >>> log.log('riding', 'r1')
+    >>> log.log('party', 'ndp')
+    >>> log.advance()
+    >>> log.log('riding', 'r1')
+    >>> log.since(1)
+    [('riding', 'r1')]
+    >>> log.since(0)
+    [('riding', 'r1'), ('party', 'ndp')]
+    """
+    version: int
+    _changed: Dict[Tuple[str, str], int]
+
+    def __init__(self) -> None:
+        """Initialize this log at version 0, with no changes.
+        """
+        self.version = 0
+        self._changed = {}
+
+    def advance(self) -> None:
+        """Move this log to its next version.
+        """
+        self.version += 1
+
+    def log(self, kind: str, name: str) -> None:
+        """Record that (<kind>, <name>) changed in the current version.
+        """
+        key = (kind, name)
+        self._changed.pop(key, None)
+        self._changed[key] = self.version
+
+    def log_all(self, kind: str, names: Iterable[str]) -> None:
+        """Record that (<kind>, <name>) changed in the current version, for
+        every name in <names>.
+        """
+        changed = self._changed
+        version = self.version
+        for name in names:
+            key = (kind, name)
+            changed.pop(key, None)
+            changed[key] = version
+
+    def since(self, version: int) -> List[Tuple[str, str]]:
+        """Return every (kind, name) that changed after <version>, from most
+        to least recently changed.  This takes time proportional to the
+        number of changes returned.
+        """
+        result = []
+        for key, changed in reversed(self._changed.items()):
+            if changed <= version:
+                break
+            result.append(key)
+        return result
+
+
+class VersionedDict(dict):
+    """A dictionary that counts the changes made to it, so that what was
+    computed from it can be checked for being out of date.
+
+    === Public Attributes ===
+    version:
+        the number of changes made to this dictionary.  Every call that may
+        add, replace or remove a key counts as a change.
+
+    === Sample Usage ===
+    >>> d = VersionedDict()
+    >>> d['a'] = 1
+    >>> d.update({'b': 2})
+    >>> d.version
+    2
+    >>> del d['a']
+    >>> d.setdefault('b', 3)
+    2
+    >>> d.version
+    3
+    """
+    version: int
+
+    def __init__(self) -> None:
+        """Initialize an empty dictionary, with no changes so far.
+        """
+        dict.__init__(self)
+        self.version = 0
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        """Set the value of <key> to <value>.
+        """
+        self.version += 1
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        """Remove <key> from this dictionary.
+        """
+        self.version += 1
+        dict.__delitem__(self, key)
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        """Remove <key> from this dictionary and return its value, as
+        dict.pop does.
+        """
+        self.version += 1
+        return dict.pop(self, key, *default)
+
+    def popitem(self) -> Tuple[Any, Any]:
+        """Remove and return the last key and value added, as dict.popitem
+        does.
+        """
+        self.version += 1
+        return dict.popitem(self)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        """Return the value of <key>, first setting it to <default> if it has
+        none, as dict.setdefault does.
+        """
+        if key not in self:
+            self.version += 1
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        """Add the keys and values in <args> and <kwargs>, as dict.update
+        does.
+        """
+        self.version += 1
+        dict.update(self, *args, **kwargs)
+
+    def clear(self) -> None:
+        """Remove every key from this dictionary.
+        """
+        self.version += 1
+        dict.clear(self)
+
+
+class ElectionHistory:
+    """Elections held on different dates, with an index of their dates.
+
+    This class is abstract and should not be directly instantiated; its
+    subclasses record the results of each election.
+
+    === Private Attributes ===
+    _elections: the election history.  Each key is a date, and its value
+        holds the results of an election that was held on that date.
+    _dates: the dates in _elections, in order.  Elections may be added to
+        _elections directly, so _sorted_dates brings this up to date before
+        it is used.
+    _dates_version: the version of _elections that _dates was built from.
+    _snapshot_file: the snapshot file (an election_compact.Snapshot) that
+        the elections were loaded from, or None if they were not loaded from
+        one or it has been closed.
+
+    === Representation Invariants ==
+    - self._dates is sorted.
+    - If self._dates_version == self._elections.version, the dates in
+      self._dates are exactly those in self._elections.
+
+    === Sample Usage ===
+    # See the method docstrings for sample usage.
+    """
+    _elections: VersionedDict
+    _dates: List[date]
+    _dates_version: int
+    _snapshot_file: Optional[Any]
+
+    def __init__(self) -> None:
+        """Initialize this history, with no elections so far.
+        """
+        self._elections = VersionedDict()
+        self._dates = []
+        self._dates_version = 0
+        self._snapshot_file = None
+
+    def _sorted_dates(self) -> List[date]:
+        """Return the dates of all elections in this history, in order.
+
+        The index is rebuilt only when _elections has changed since it was
+        last built.  The returned list is this history's own index, and must
+        not be changed.
+
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> j._elections[date(2004, 1, 1)] = None
+        >>> j._elections[date(2000, 1, 1)] = None
+        >>> j._sorted_dates()
+        [datetime.date(2000, 1, 1), datetime.date(2004, 1, 1)]
+        >>> del j._elections[date(2004, 1, 1)]
+        >>> j._elections[date(2008, 1, 1)] = None
+        >>> j._sorted_dates()
+        [datetime.date(2000, 1, 1), datetime.date(2008, 1, 1)]
+        """
+        if self._dates_version != self._elections.version:
+            self._dates = sorted(self._elections)
+            self._dates_version = self._elections.version
+        return self._dates
+
+    def save(self, path: str) -> None:
+        """Write every election in this history to a snapshot file at <path>,
+        which load can read back.  See election_compact.save_snapshot for the
+        format of the file.
+
+        >>> import os, tempfile
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> e = project1.Election(date(2000, 2, 8))
+        >>> e.update_results('r1', 'ndp', 1)
+        >>> e.update_results('r2', 'lib', 3)
+        >>> j._elections[date(2000, 2, 8)] = e
+        >>> with tempfile.TemporaryDirectory() as folder:
+        ...     path = os.path.join(folder, 'canada.snap')
+        ...     j.save(path)
+        ...     copy = project1.Jurisdiction('Canada')
+        ...     copy.load(path)
+        ...     copy.close()
+        >>> copy.party_history('lib') == j.party_history('lib')
+        True
+        >>> copy.election_on(date(2000, 2, 8)).riding_winners('r2')
+        ['lib']
+        """
+        import_module('election_compact').save_snapshot(self._elections, path)
+
+    def load(self, path: str) -> None:
+        """Replace the elections in this history with those in the snapshot
+        file at <path>, written by save.
+
+        The file is memory-mapped, and the elections are loaded as
+        CompactElections that read their vote counts directly from it (see
+        election_compact.Snapshot), until close is called.  Any snapshot file
+        this history was loaded from before is closed first.
+
+        Raise ValueError if the file is not a snapshot of this version, or
+        its checksum does not match its contents.
+        """
+        self.close()
+        snapshot = import_module('election_compact').Snapshot(path)
+        self._elections.clear()
+        self._elections.update(snapshot.elections)
+        self._snapshot_file = snapshot
+
+    def close(self) -> None:
+        """Copy the vote counts that the elections in this history still read
+        from the snapshot file they were loaded from into memory, and close
+        the file.  Do nothing if there is no such file open.
+        """
+        if self._snapshot_file is not None:
+            self._snapshot_file.close()
+            self._snapshot_file = None
+
+    def elections_between(self, start: date, end: date) -> List[date]:
+        """Return the dates of all elections in this history from <start> to
+        <end>, inclusive, in order.
+
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> for year in [2008, 2000, 2004, 2011]:
+        ...     j._elections[date(year, 1, 1)] = \\
+        ...         project1.Election(date(year, 1, 1))
+        >>> j.elections_between(date(2001, 1, 1), date(2008, 1, 1))
+        [datetime.date(2004, 1, 1), datetime.date(2008, 1, 1)]
+        """
+        dates = self._sorted_dates()
+        return dates[bisect_left(dates, start):bisect_right(dates, end)]
+
+    def latest_elections(self, n: int) -> List[date]:
+        """Return the dates of the latest <n> elections in this history, in
+        order.  Return all of them if there are fewer than <n>.
+
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> for year in [2008, 2000, 2004, 2011]:
+        ...     j._elections[date(year, 1, 1)] = \\
+        ...         project1.Election(date(year, 1, 1))
+        >>> j.latest_elections(2)
+        [datetime.date(2008, 1, 1), datetime.date(2011, 1, 1)]
+        """
+        dates = self._sorted_dates()
+        return dates[max(len(dates) - n, 0):]
+
+    def election_on(self, d: date) -> Any:
+        """Return the election on date <d> in this history, or None if there
+        is none.
+
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> e = project1.Election(date(2000, 1, 1))
+        >>> j._elections[date(2000, 1, 1)] = e
+        >>> j.election_on(date(2000, 1, 1)) is e
+        True
+        >>> j.election_on(date(2004, 1, 1)) is None
+        True
+        """
+        return self._elections.get(d)
+
+    def nearest_election(self, d: date) -> Optional[date]:
+        """Return the date of the election in this history closest to <d>, or
+        None if there are no elections.  If two elections are equally close,
+        return the earlier one.
+
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> j.nearest_election(date(2005, 1, 1)) is None
+        True
+        >>> for year in [2008, 2000, 2004, 2011]:
+        ...     j._elections[date(year, 1, 1)] = \\
+        ...         project1.Election(date(year, 1, 1))
+        >>> j.nearest_election(date(2007, 1, 1))
+        datetime.date(2008, 1, 1)
+        >>> j.nearest_election(date(1990, 1, 1))
+        datetime.date(2000, 1, 1)
+        """
+        dates = self._sorted_dates()
+        i = bisect_left(dates, d)
+        candidates = dates[max(i - 1, 0):i + 1]
+        if len(candidates) == 0:
+            return None
+        return min(candidates, key=lambda c: abs(c - d))
+
+    def all_party_history(self) -> Tuple[List[date], List[str],
+                                         List[List[float]]]:
+        """Return every party's percentage of the popular vote in each
+        election in this history, as a table.
+
+        Return a tuple (dates, parties, table), where dates are the dates of
+        the elections with votes recorded, in date order, parties are all the
+        parties with votes in any of them, and table[p][i] is the percentage
+        of the popular vote earned by parties[p] in the election on dates[i].
+        That is, table[p][i] == self.party_history(parties[p])[dates[i]].
+
+        Each election's popular vote is computed only once.
+
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> e1 = project1.Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e1.update_results('r1', 'lib', 3)
+        >>> e2 = project1.Election(date(2004, 5, 16))
+        >>> e2.update_results('r1', 'lib', 1)
+        >>> e2.update_results('r1', 'pc', 1)
+        >>> j._elections[date(2004, 5, 16)] = e2
+        >>> j._elections[date(2000, 2, 8)] = e1
+        >>> dates, parties, table = j.all_party_history()
+        >>> dates
+        [datetime.date(2000, 2, 8), datetime.date(2004, 5, 16)]
+        >>> parties
+        ['ndp', 'lib', 'pc']
+        >>> table
+        [[0.25, 0.0], [0.75, 0.5], [0.0, 0.5]]
+        """
+        dates = []
+        votes = []
+        party_ids = {}
+        for d in self._sorted_dates():
+            popular_vote = self._elections[d].popular_vote()
+            if len(popular_vote) > 0:
+                dates.append(d)
+                votes.append(popular_vote)
+                for party in popular_vote:
+                    party_ids.setdefault(party, len(party_ids))
+        table = [[0.0] * len(dates) for _ in party_ids]
+        for i in range(len(dates)):
+            total = sum(votes[i].values())
+            for party, party_vote in votes[i].items():
+                table[party_ids[party]][i] = party_vote / total
+        return dates, list(party_ids), table
+
+    def all_party_wins(self) -> Dict[str, List[date]]:
+        """Return, for every party that has won an election in this history,
+        the dates of the elections it won, in date order.
+
+        As in party_wins, a party that tied for most seats won that election.
+        Each election's winners are computed only once.
+
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> e1 = project1.Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e1.update_results('r2', 'lib', 1)
+        >>> e2 = project1.Election(date(2004, 5, 16))
+        >>> e2.update_results('r1', 'lib', 2)
+        >>> j._elections[date(2004, 5, 16)] = e2
+        >>> j._elections[date(2000, 2, 8)] = e1
+        >>> j.all_party_wins() == {'ndp': [date(2000, 2, 8)],
+        ...                        'lib': [date(2000, 2, 8), date(2004, 5, 16)]}
+        True
+        """
+        wins = {}
+        for d in self._sorted_dates():
+            for party in self._elections[d].election_winners():
+                wins.setdefault(party, []).append(d)
+        return wins
+
+    def riding_turnover(self) -> Tuple[List[date], List[str], List[List[int]]]:
+        """Return the changes in ridings across elections in this history, as
+        a table.
+
+        Return a tuple (dates, ridings, table), where dates are the dates of
+        all elections in this history in date order, ridings are all the
+        ridings with votes in any of them, and table[r][i] is 1 if ridings[r]
+        was added between the elections on dates[i] and dates[i + 1], -1 if
+        it was removed, and 0 otherwise.  This is the same information as
+        Jurisdiction.riding_changes.
+
+        >>> from importlib import import_module
+        >>> project1 = import_module('LingXin Li Python project1')
+        >>> j = project1.Jurisdiction('Canada')
+        >>> e1 = project1.Election(date(2000, 2, 8))
+        >>> e1.update_results('r1', 'ndp', 1)
+        >>> e1.update_results('r2', 'pc', 1)
+        >>> j._elections[date(2000, 2, 8)] = e1
+        >>> e2 = project1.Election(date(2004, 5, 16))
+        >>> e2.update_results('r1', 'ndp', 1)
+        >>> e2.update_results('r3', 'pc', 1)
+        >>> j._elections[date(2004, 5, 16)] = e2
+        >>> j.riding_turnover()
+        ([datetime.date(2000, 2, 8), datetime.date(2004, 5, 16)], \
+['r1', 'r2', 'r3'], [[0], [-1], [1]])
+        """
+        dates = self._sorted_dates()[:]
+        riding_ids = {}
+        present = []
+        for d in dates:
+            ids = set()
+            for riding in self._elections[d].ridings_recorded():
+                ids.add(riding_ids.setdefault(riding, len(riding_ids)))
+            present.append(ids)
+        table = [[0] * max(len(dates) - 1, 0) for _ in riding_ids]
+        for i in range(len(dates) - 1):
+            for r in present[i] - present[i + 1]:
+                table[r][i] = -1
+            for r in present[i + 1] - present[i]:
+                table[r][i] = 1
+        return dates, list(riding_ids), table
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'datetime', 'typing', 'bisect', 'heapq',
+            'importlib'
+        ],
+        'max-attributes': 15
+    })
+
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,994 @@
+"""CSC148 Assignment 0: Election storage backends
+
+=== Module description ===
+This module contains Elections (from LingXin Li Python project1.py) that keep
+their results outside of Python dictionaries, for elections too large to hold
+in memory or that need to persist: ShardedElection (csv shard files),
+SQLiteElection (an SQLite database) and LazyElection (the original csv files,
+read a riding at a time), along with a Jurisdiction for each of them.
+"""
+import csv
+import os
+import sqlite3
+import zlib
+from array import array
+from collections import OrderedDict
+from contextlib import ExitStack
+from datetime import date
+from heapq import merge
+from importlib import import_module
+from itertools import groupby
+from typing import Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+# The module with Election and Jurisdiction.  Its file name has spaces, so it
+# can only be imported by name.
+ELECTIONS = import_module('LingXin Li Python project1')
+
+# The most runs a shard of a ShardedElection holds before they are merged.
+MAX_RUNS = 8
+
+
+class ShardedElection(ELECTIONS.Election):
+    """An Election that keeps its results on disk, for elections too large to
+    hold in memory.
+
+    Updates are tallied in memory by (riding, party) until there are
+    max_pending of them, and are then written to one of several shards in a
+    folder.  Each riding always goes to the same shard, so the results for a
+    riding can be found by reading only its shard, and the ridings of the
+    election can be processed one shard at a time.  The total votes of each
+    party are kept in memory, so popular_vote does not read the shards.
+
+    A shard is a csv file with one row per (riding, party), sorted by riding,
+    along with the runs written to it since it was last compacted: csv files
+    with the tallies of one spill each, also sorted by riding.  Compacting a
+    shard merges its runs into it, reading each file once, a row at a time.  A
+    shard is compacted when it has MAX_RUNS runs and before it is read, so
+    the whole shard is never held in memory: only one row of each file and
+    the results of one riding are.  Reading a riding takes time proportional
+    to the number of (riding, party) pairs in its shard, about 1/shards of
+    those in the election, and queries on every riding read each shard once.
+
+    === Private Attributes ===
+    _folder: the folder that holds the shard files.
+    _shards: the number of shard files.
+    _max_pending: the most (riding, party) tallies held in memory at once.
+    _riding_shards: the shard that holds the results of each riding.
+    _pending: updates that have not yet been written to a shard, tallied by
+        (riding, party).
+    _runs: the number of runs written to each shard since it was last
+        compacted, for the shards that have any.
+
+    === Representation Invariants ==
+    - self._results == {} and self._leaders == {}
+    - len(self._pending) < self._max_pending
+
+    === Sample Usage ===
+    >>> import tempfile
+    >>> folder = tempfile.TemporaryDirectory()
+    >>> e = ShardedElection(date(2000, 2, 8), folder.name, max_pending=2)
+    >>> e.update_results('r1', 'ndp', 1)
+    >>> e.update_results('r1', 'lib', 2)
+    >>> e.update_results('r2', 'pc', 4)
+    >>> e.update_results('r1', 'ndp', 2)
+    >>> e.results_for('r1', 'ndp')
+    3
+    >>> e.riding_winners('r1')
+    ['ndp']
+    >>> e.popular_vote() == {'ndp': 3, 'lib': 2, 'pc': 4}
+    True
+    >>> e.party_seats() == {'ndp': 1, 'lib': 0, 'pc': 1}
+    True
+    >>> e.closest_races(1)
+    [('r1', 1)]
+    >>> ShardedElection(date(2000, 2, 8), folder.name)
+    Traceback (most recent call last):
+    ...
+    ValueError: folder is not empty: it holds another election's shards
+    >>> folder.cleanup()
+    """
+    _folder: str
+    _shards: int
+    _max_pending: int
+    _riding_shards: Dict[str, int]
+    _pending: Dict[Tuple[str, str], int]
+    _runs: Dict[int, int]
+
+    def __init__(self, d: date, folder: str, shards: int = 16,
+                 max_pending: int = 100000) -> None:
+        """Initialize a new election on date d and with no ridings, parties,
+        or votes recorded so far, that keeps its results in <shards> files in
+        <folder> and holds at most <max_pending> tallies in memory.
+
+        The folder is created if it does not exist.  Raise ValueError if it
+        is not empty, since its shards would be read as part of this
+        election.
+        """
+        ELECTIONS.Election.__init__(self, d)
+        self._folder = folder
+        self._shards = shards
+        self._max_pending = max_pending
+        self._riding_shards = {}
+        self._pending = {}
+        self._runs = {}
+        os.makedirs(folder, exist_ok=True)
+        if len(os.listdir(folder)) > 0:
+            raise ValueError("folder is not empty: it holds another "
+                             "election's shards")
+
+    def update_results(self, riding: str, party: str, votes: int) -> None:
+        """Update this election to reflect that in <riding>, <party> received
+        <votes> additional votes.
+
+        Precondition: votes >= 1
+        """
+        self._start_update()
+        if party not in self._party_ids:
+            self._add_party(party)
+        if riding not in self._riding_shards:
+            self._riding_shards[riding] = \
+                zlib.crc32(riding.encode('utf-8')) % self._shards
+            self._ridings.append(riding)
+        self._totals[party] += votes
+        key = (riding, party)
+        self._pending[key] = self._pending.get(key, 0) + votes
+        if len(self._pending) >= self._max_pending:
+            self._spill()
+        self._log_change(riding, [party])
+        # Seats are not tracked as updates arrive, so any party's may change.
+        self._changes.log('seats', '')
+
+    def _merge_lines(self, lines: List[str]) -> None:
+        """Add the votes in <lines>, rows of a csv file in the format defined
+        in the A0 handout, to this election.
+
+        Seats are not tracked here, so no ridings are added to _unranked.
+        """
+        self.merge_batch(ELECTIONS.tally_lines(lines))
+
+    def merge_batch(self, batch: Dict[Tuple[str, str], int]) -> None:
+        """Merge <batch> into the pending updates of this election, spilling
+        them to the shards as they fill up.
+
+        Each key in <batch> is a (riding, party) pair, and its value is the
+        number of additional votes that party received in that riding.
+        """
+        if len(batch) == 0:
+            return
+        self._start_update()
+        for key, votes in batch.items():
+            riding, party = key
+            if party not in self._party_ids:
+                self._add_party(party)
+            if riding not in self._riding_shards:
+                self._riding_shards[riding] = \
+                    zlib.crc32(riding.encode('utf-8')) % self._shards
+                self._ridings.append(riding)
+            self._totals[party] += votes
+            self._pending[key] = self._pending.get(key, 0) + votes
+            if len(self._pending) >= self._max_pending:
+                self._spill()
+            self._log_change(riding, [party])
+        # Seats are not tracked as updates arrive, so any party's may change.
+        self._changes.log('seats', '')
+
+    def _shard_path(self, shard: int, run: int = 0) -> str:
+        """Return the path of shard number <shard> of this election, or of
+        its run number <run> if <run> is not 0.
+        """
+        name = 'shard' + str(shard)
+        if run > 0:
+            name += '-run' + str(run)
+        return os.path.join(self._folder, name + '.csv')
+
+    def _spill(self) -> None:
+        """Write every pending update to a new run of the shard of its
+        riding, sorted by riding.
+        """
+        rows_by_shard = {}
+        for key, votes in self._pending.items():
+            shard = self._riding_shards[key[0]]
+            rows_by_shard.setdefault(shard, []).append([key[0], key[1], votes])
+        for shard, rows in rows_by_shard.items():
+            run = self._runs.get(shard, 0) + 1
+            rows.sort(key=_riding_of)
+            with open(self._shard_path(shard, run), 'w',
+                      newline='') as output:
+                csv.writer(output).writerows(rows)
+            self._runs[shard] = run
+            if run >= MAX_RUNS:
+                self._compact(shard)
+        self._pending = {}
+
+    def _compact(self, shard: int) -> None:
+        """Merge the runs of shard number <shard> into it.
+
+        The files are merged one row at a time, and the merged shard is
+        written beside the old one and then replaces it, so the shard is
+        never left half written.  Rows from older files come first, so each
+        riding keeps its parties in the order they first got votes.
+        """
+        path = self._shard_path(shard)
+        paths = [self._shard_path(shard, run)
+                 for run in range(1, self._runs.pop(shard, 0) + 1)]
+        if os.path.exists(path):
+            paths.insert(0, path)
+        with ExitStack() as stack:
+            readers = [csv.reader(stack.enter_context(open(p, newline='')))
+                       for p in paths]
+            with open(path + '.tmp', 'w', newline='') as output:
+                writer = csv.writer(output)
+                _visit_ridings(merge(*readers, key=_riding_of),
+                               lambda riding, party_data: writer.writerows(
+                                   [riding, party, votes]
+                                   for party, votes in party_data.items()))
+        os.replace(path + '.tmp', path)
+        for run_path in paths[1:] if paths[0] == path else paths:
+            os.remove(run_path)
+
+    def _prepare_shard(self, shard: int) -> str:
+        """Write every pending update and compact shard number <shard>, and
+        return its path.
+        """
+        self._spill()
+        if shard in self._runs:
+            self._compact(shard)
+        return self._shard_path(shard)
+
+    def _visit_shard(self, shard: int,
+                     visit: Callable[[str, Dict[str, int]], None]) -> None:
+        """Call <visit> on each riding in shard number <shard> and its results
+        (see _riding_results), in order by riding, reading the shard once.
+        """
+        path = self._prepare_shard(shard)
+        if os.path.exists(path):
+            with open(path, newline='') as input_stream:
+                _visit_ridings(csv.reader(input_stream), visit)
+
+    def _riding_results(self, riding: str) -> Dict[str, int]:
+        """Return the number of votes of each party with at least one vote in
+        <riding>.
+
+        The shard of <riding> is read only up to the end of its rows.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        with open(self._prepare_shard(self._riding_shards[riding]),
+                  newline='') as input_stream:
+            for name, rows in groupby(csv.reader(input_stream),
+                                      key=_riding_of):
+                if name == riding:
+                    return _party_totals(rows)
+        return {}
+
+    def _visit_ranked_ridings(self, visit: Callable[
+            [str, List[str], Dict[str, int]], None]) -> None:
+        """Call <visit> on each riding with its ranking and results (see
+        _ranked_results), one shard at a time, reading each shard once.
+        """
+        for shard in range(self._shards):
+            self._visit_shard(shard, lambda riding, party_data: visit(
+                riding, sorted(party_data, key=lambda p: -party_data[p]),
+                party_data))
+
+    def riding_margins(self) -> Dict[str, Tuple[List[str], List[str], int]]:
+        """Return, for each riding, its winners, its runners-up and the margin
+        of victory (see RankedResults.riding_margins), reading each shard
+        once.  The ridings are in the order of ridings_recorded.
+        """
+        margins = super().riding_margins()
+        return {riding: margins[riding] for riding in self._ridings}
+
+    def results_for(self, riding: str, party: str) -> Optional[int]:
+        """Return the number of votes received in <riding> by <party> in
+        this election, or None if it has none.
+        """
+        if riding not in self._riding_shards:
+            return None
+        return self._riding_results(riding).get(party)
+
+    def riding_winners(self, riding: str) -> List[str]:
+        """Return the winners, in <riding>, of this election.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        return _winners(self._riding_results(riding))
+
+    def party_seats(self) -> Dict[str, int]:
+        """For each party, return the number of ridings that it won in this
+        election, reading the shards one at a time.
+        """
+        seats = {party: 0 for party in self._parties}
+        for shard in range(self._shards):
+            self._visit_shard(shard, lambda riding, party_data: _add_seat(
+                seats, party_data))
+        return seats
+
+
+def _riding_of(row: List[str]) -> str:
+    """Return the riding of <row>, a row of a ShardedElection shard.
+    """
+    return row[0]
+
+
+def _party_totals(rows: Iterable[List[str]]) -> Dict[str, int]:
+    """Return the total votes of each party in <rows>, rows of a
+    ShardedElection shard, in the order the parties first appear.
+
+    >>> _party_totals([['r1', 'ndp', '1'], ['r1', 'lib', '2'],
+    ...                ['r1', 'ndp', '3']])
+    {'ndp': 4, 'lib': 2}
+    """
+    party_data = {}
+    for row in rows:
+        party_data[row[1]] = party_data.get(row[1], 0) + int(row[2])
+    return party_data
+
+
+def _visit_ridings(rows: Iterable[List[str]],
+                   visit: Callable[[str, Dict[str, int]], None]) -> None:
+    """Call <visit> on each riding in <rows>, rows of ShardedElection shards,
+    and the total votes of each of its parties (see _party_totals), holding
+    only one riding's rows in memory at a time.
+
+    Precondition: the rows of each riding are next to each other in <rows>.
+
+    >>> _visit_ridings([['r1', 'ndp', '1'], ['r1', 'lib', '2'],
+    ...                 ['r2', 'pc', '4']], print)
+    r1 {'ndp': 1, 'lib': 2}
+    r2 {'pc': 4}
+    """
+    for riding, rows_of_riding in groupby(rows, key=_riding_of):
+        visit(riding, _party_totals(rows_of_riding))
+
+
+def _add_seat(seats: Dict[str, int], party_data: Dict[str, int]) -> None:
+    """Add 1 to the seats in <seats> of the winner of the riding with results
+    <party_data>, if it has a single winner.
+    """
+    winners = _winners(party_data)
+    if len(winners) == 1:
+        seats[winners[0]] += 1
+
+
+class SQLiteElection(ELECTIONS.Election):
+    """An Election whose results are stored in an SQLite database, so that
+    they persist and can be shared with a SQLiteJurisdiction.
+
+    The results of all elections in a database are in one table, results,
+    with one row per (election, riding, party), indexed by those columns and
+    by (election, party).  Single updates are committed immediately, while
+    read_results loads a whole file in one transaction.
+
+    === Private Attributes ===
+    _connection: the connection to the database holding the results.
+    _key: the value of the election column for this election's rows.
+    _bulk: whether read_results is in progress, so updates should not be
+        committed yet.
+
+    === Representation Invariants ==
+    - self._results == {} and self._leaders == {}
+
+    === Sample Usage ===
+    >>> e = SQLiteElection(date(2000, 2, 8), sqlite3.connect(':memory:'))
+    >>> e.update_results('r1', 'ndp', 1234)
+    >>> e.update_results('r1', 'lib', 1345)
+    >>> e.update_results('r1', 'pc', 1456)
+    >>> e.riding_winners('r1')
+    ['pc']
+    >>> e.update_results('r2', 'pc', 1)
+    >>> e.popular_vote() == {'ndp': 1234, 'lib': 1345, 'pc': 1457}
+    True
+    >>> e.results_for('r1', 'lib')
+    1345
+    >>> e.party_seats() == {'ndp': 0, 'lib': 0, 'pc': 2}
+    True
+    >>> e.ridings_recorded()
+    ['r1', 'r2']
+    """
+    _connection: sqlite3.Connection
+    _key: str
+    _bulk: bool
+
+    def __init__(self, d: date, connection: sqlite3.Connection) -> None:
+        """Initialize an election on date d whose results are stored in the
+        database that <connection> is connected to.
+
+        If the database already holds results for an election on date d,
+        this election has those results.
+
+        >>> connection = sqlite3.connect(':memory:')
+        >>> SQLiteElection(date(2000, 2, 8), connection).merge_batch(
+        ...     {('r1', 'ndp'): 1, ('r1', 'lib'): 3})
+        >>> e = SQLiteElection(date(2000, 2, 8), connection)
+        >>> e._totals
+        {'ndp': 1, 'lib': 3}
+        """
+        ELECTIONS.Election.__init__(self, d)
+        self._connection = connection
+        self._key = d.isoformat()
+        self._bulk = False
+        _create_results_table(connection)
+        for party, votes in self.popular_vote().items():
+            self._add_party(party)
+            self._totals[party] = votes
+
+    def update_results(self, riding: str, party: str, votes: int) -> None:
+        """Update this election to reflect that in <riding>, <party> received
+        <votes> additional votes.
+
+        Precondition: votes >= 1
+        """
+        self.merge_batch({(riding, party): votes})
+
+    def _merge_lines(self, lines: List[str]) -> None:
+        """Add the votes in <lines>, rows of a csv file in the format defined
+        in the A0 handout, to this election.
+
+        Seats are not tracked here, so no ridings are added to _unranked.
+        """
+        self.merge_batch(ELECTIONS.tally_lines(lines))
+
+    def read_results(self, input_stream: TextIO) -> None:
+        """Update this election with the results in input_stream, in a single
+        transaction.
+
+        Precondition: input_stream is an open csv file, in the format defined
+        in the A0 handout.
+        """
+        self._bulk = True
+        try:
+            with self._connection:
+                ELECTIONS.Election.read_results(self, input_stream)
+        finally:
+            self._bulk = False
+
+    def merge_batch(self, batch: Dict[Tuple[str, str], int]) -> None:
+        """Merge <batch> into this election with a single executemany.
+
+        Each key in <batch> is a (riding, party) pair, and its value is the
+        number of additional votes that party received in that riding.
+        """
+        self._start_update()
+        self._connection.executemany(
+            'INSERT INTO results VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (election, riding, party) '
+            'DO UPDATE SET votes = votes + excluded.votes',
+            [(self._key, riding, party, votes)
+             for (riding, party), votes in batch.items()])
+        if not self._bulk:
+            self._connection.commit()
+        for key, added in batch.items():
+            riding, party = key
+            if party not in self._party_ids:
+                self._add_party(party)
+            self._totals[party] += added
+            self._log_change(riding, [party])
+        # Seats are not tracked as updates arrive, so any party's may change.
+        self._changes.log('seats', '')
+
+    def ridings_recorded(self) -> List[str]:
+        """Return the ridings in which votes have been recorded in this
+        election, in the order they were first recorded.
+        """
+        rows = self._connection.execute(
+            'SELECT riding FROM results WHERE election = ? '
+            'GROUP BY riding ORDER BY MIN(rowid)', (self._key,))
+        return [row[0] for row in rows]
+
+    def results_for(self, riding: str, party: str) -> Optional[int]:
+        """Return the number of votes received in <riding> by <party> in
+        this election, or None if it has none.
+        """
+        row = self._connection.execute(
+            'SELECT votes FROM results '
+            'WHERE election = ? AND riding = ? AND party = ?',
+            (self._key, riding, party)).fetchone()
+        return None if row is None else row[0]
+
+    def _riding_results(self, riding: str) -> Dict[str, int]:
+        """Return the number of votes of each party with at least one vote in
+        <riding>.
+        """
+        rows = self._connection.execute(
+            'SELECT party, votes FROM results '
+            'WHERE election = ? AND riding = ? ORDER BY rowid',
+            (self._key, riding))
+        return dict(rows.fetchall())
+
+    def riding_winners(self, riding: str) -> List[str]:
+        """Return the winners, in <riding>, of this election.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        return _winners(self._riding_results(riding))
+
+    def popular_vote(self) -> Dict[str, int]:
+        """For each party, return the total number of votes it earned, across
+        all ridings, in this election.
+        """
+        rows = self._connection.execute(
+            'SELECT party, SUM(votes) FROM results WHERE election = ? '
+            'GROUP BY party ORDER BY MIN(rowid)', (self._key,))
+        return dict(rows.fetchall())
+
+    def party_seats(self) -> Dict[str, int]:
+        """For each party, return the number of ridings that it won in this
+        election.
+        """
+        seats = dict.fromkeys(self.popular_vote(), 0)
+        leaders = {}
+        rows = self._connection.execute(
+            'SELECT riding, party FROM results AS r WHERE election = ? AND '
+            'votes = (SELECT MAX(votes) FROM results '
+            'WHERE election = r.election AND riding = r.riding)', (self._key,))
+        for riding, party in rows:
+            leaders.setdefault(riding, []).append(party)
+        for parties in leaders.values():
+            if len(parties) == 1:
+                seats[parties[0]] += 1
+        return seats
+
+
+def _create_results_table(connection: sqlite3.Connection) -> None:
+    """Create the results table used by SQLiteElection and its indexes in
+    the database that <connection> is connected to, if they do not exist.
+    """
+    with connection:
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'election TEXT NOT NULL, riding TEXT NOT NULL, '
+            'party TEXT NOT NULL, votes INTEGER NOT NULL, '
+            'PRIMARY KEY (election, riding, party))')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS results_by_party '
+            'ON results (election, party)')
+
+
+class LazyElection(ELECTIONS.Election):
+    """An Election that reads the results of a riding from its csv files only
+    when they are needed, for looking at a few ridings of a large election.
+
+    Adding a csv file only records, for each riding, the byte offsets of its
+    rows in the file (along with each party's total votes, which take little
+    memory).  The results of a riding are parsed from those rows the first
+    time they are asked for, and the results of the cache_size most recently
+    used ridings are kept in memory.
+
+    Only results added with add_file are read lazily.  A stream passed to
+    read_results cannot be read again later, so its results, like those added
+    with update_results, are kept in memory (in _extra), and combined with
+    the results in the csv files.
+
+    === Public Attributes ===
+    cache_size:
+        the most ridings whose results are kept in memory at once
+
+    === Private Attributes ===
+    _index: for each riding, the path of each csv file with rows for it and
+        the byte offsets of those rows.
+    _extra: the results added with update_results, in the same form as
+        Election._results.
+    _loaded: the results of recently used ridings, least recently used first.
+
+    === Representation Invariants ==
+    - self._results == {} and self._leaders == {}
+    - len(self._loaded) <= self.cache_size
+
+    === Sample Usage ===
+    >>> import os, tempfile
+    >>> from election_benchmark import write_synthetic_results
+    >>> folder = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(folder.name, 'results.csv')
+    >>> with open(path, 'w') as output:
+    ...     write_synthetic_results(output, 10, 3, 200)
+    >>> e = LazyElection(date(2000, 2, 8), cache_size=2)
+    >>> e.add_file(path)
+    >>> full = ELECTIONS.Election(date(2000, 2, 8))
+    >>> with open(path) as input_stream:
+    ...     full.read_results(input_stream)
+    >>> e.results_for('riding 3', 'party 1') == \\
+    ...     full.results_for('riding 3', 'party 1')
+    True
+    >>> e.party_seats() == full.party_seats()
+    True
+    >>> e.popular_vote() == full.popular_vote()
+    True
+    >>> len(e._loaded)
+    2
+    >>> folder.cleanup()
+    """
+    cache_size: int
+    _index: Dict[str, List[Tuple[str, array]]]
+    _extra: Dict[str, Dict[str, int]]
+    _loaded: OrderedDict
+
+    def __init__(self, d: date, cache_size: int = 64) -> None:
+        """Initialize a new election on date d and with no ridings, parties,
+        or votes recorded so far, that keeps the results of at most
+        <cache_size> ridings in memory.
+        """
+        ELECTIONS.Election.__init__(self, d)
+        self.cache_size = cache_size
+        self._index = {}
+        self._extra = {}
+        self._loaded = OrderedDict()
+
+    def add_file(self, path: str) -> None:
+        """Add the results in the csv file at <path> to this election, by
+        recording where the rows of each riding are in the file.
+
+        Precondition: <path> names a csv file, in the format defined in the A0
+        handout, with one row per line.
+        """
+        self._start_update()
+        self._loaded.clear()
+        offsets = {}
+        with open(path, 'rb') as input_stream:
+            input_stream.readline()
+            offset = input_stream.tell()
+            line = input_stream.readline()
+            while line != b'':
+                row = next(csv.reader([line.decode('utf-8')]), [])
+                if len(row) > ELECTIONS.VOTES and \
+                        int(row[ELECTIONS.VOTES]) > 0:
+                    riding = row[ELECTIONS.RIDING]
+                    party = row[ELECTIONS.PARTY]
+                    if riding not in offsets:
+                        offsets[riding] = array('q')
+                        self._add_riding(riding)
+                    offsets[riding].append(offset)
+                    if party not in self._party_ids:
+                        self._add_party(party)
+                    self._totals[party] += int(row[ELECTIONS.VOTES])
+                    self._log_change(None, [party])
+                offset = input_stream.tell()
+                line = input_stream.readline()
+        for riding, riding_offsets in offsets.items():
+            self._index[riding].append((path, riding_offsets))
+            self._log_change(riding, [])
+        self._changes.log('seats', '')
+
+    def _add_riding(self, riding: str) -> None:
+        """Record that <riding> has votes in this election.
+
+        Precondition: <riding> is not already recorded in this election.
+        """
+        if riding not in self._index:
+            self._index[riding] = []
+            self._ridings.append(riding)
+
+    def update_results(self, riding: str, party: str, votes: int) -> None:
+        """Update this election to reflect that in <riding>, <party> received
+        <votes> additional votes.
+
+        Precondition: votes >= 1
+        """
+        self._start_update()
+        if party not in self._party_ids:
+            self._add_party(party)
+        self._add_riding(riding)
+        party_data = self._extra.setdefault(riding, {})
+        party_data[party] = party_data.get(party, 0) + votes
+        self._totals[party] += votes
+        self._loaded.pop(riding, None)
+        self._log_change(riding, [party])
+        # Seats are not tracked as updates arrive, so any party's may change.
+        self._changes.log('seats', '')
+
+    def _merge_lines(self, lines: List[str]) -> None:
+        """Add the votes in <lines>, rows of a csv file in the format defined
+        in the A0 handout, to this election.
+
+        Seats are not tracked here, so no ridings are added to _unranked.
+        """
+        self.merge_batch(ELECTIONS.tally_lines(lines))
+
+    def merge_batch(self, batch: Dict[Tuple[str, str], int]) -> None:
+        """Merge <batch> into the results of this election that are kept in
+        memory.
+
+        Each key in <batch> is a (riding, party) pair, and its value is the
+        number of additional votes that party received in that riding.
+        """
+        if len(batch) == 0:
+            return
+        self._start_update()
+        for key, votes in batch.items():
+            riding, party = key
+            if party not in self._party_ids:
+                self._add_party(party)
+            self._add_riding(riding)
+            party_data = self._extra.setdefault(riding, {})
+            party_data[party] = party_data.get(party, 0) + votes
+            self._totals[party] += votes
+            self._loaded.pop(riding, None)
+            self._log_change(riding, [party])
+        # Seats are not tracked as updates arrive, so any party's may change.
+        self._changes.log('seats', '')
+
+    def _riding_results(self, riding: str) -> Dict[str, int]:
+        """Return the number of votes of each party with at least one vote in
+        <riding>, reading them from the csv files if they are not cached.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        if riding in self._loaded:
+            self._loaded.move_to_end(riding)
+            return self._loaded[riding]
+        party_data = {}
+        for path, offsets in self._index[riding]:
+            with open(path, 'rb') as input_stream:
+                for offset in offsets:
+                    input_stream.seek(offset)
+                    row = next(csv.reader(
+                        [input_stream.readline().decode('utf-8')]))
+                    party = row[ELECTIONS.PARTY]
+                    party_data[party] = \
+                        party_data.get(party, 0) + int(row[ELECTIONS.VOTES])
+        for party, votes in self._extra.get(riding, {}).items():
+            party_data[party] = party_data.get(party, 0) + votes
+        self._loaded[riding] = party_data
+        if len(self._loaded) > self.cache_size:
+            self._loaded.popitem(last=False)
+        return party_data
+
+    def results_for(self, riding: str, party: str) -> Optional[int]:
+        """Return the number of votes received in <riding> by <party> in
+        this election, or None if it has none.
+        """
+        if riding not in self._index:
+            return None
+        return self._riding_results(riding).get(party)
+
+    def riding_winners(self, riding: str) -> List[str]:
+        """Return the winners, in <riding>, of this election.
+
+        Precondition: <riding> has at least 1 vote recorded in this election.
+        """
+        return _winners(self._riding_results(riding))
+
+    def party_seats(self) -> Dict[str, int]:
+        """For each party, return the number of ridings that it won in this
+        election, reading the ridings one at a time.
+        """
+        seats = {party: 0 for party in self._parties}
+        for riding in self._ridings:
+            winners = self.riding_winners(riding)
+            if len(winners) == 1:
+                seats[winners[0]] += 1
+        return seats
+
+
+def _winners(party_data: Dict[str, int]) -> List[str]:
+    """Return the parties with the most votes in <party_data>, which maps
+    parties to their votes in one riding.
+
+    >>> _winners({'ndp': 3, 'lib': 5, 'pc': 5})
+    ['lib', 'pc']
+    """
+    max_value = max(party_data.values())
+    return [p for p in party_data if party_data[p] == max_value]
+
+
+class ShardedJurisdiction(ELECTIONS.Jurisdiction):
+    """A Jurisdiction whose elections are ShardedElections, for election
+    histories too large to hold in memory.
+
+    === Private Attributes ===
+    _folder: the folder that holds a subfolder of shards for each election.
+    _shards: the number of shard files for each election.
+    _max_pending: the most (riding, party) tallies each election holds in
+        memory at once.
+
+    === Sample Usage ===
+    >>> import io, tempfile
+    >>> from election_benchmark import write_synthetic_results
+    >>> folder = tempfile.TemporaryDirectory()
+    >>> j = ShardedJurisdiction('Canada', folder.name, max_pending=10)
+    >>> results = io.StringIO()
+    >>> write_synthetic_results(results, 20, 3, 200)
+    >>> j.read_results(2000, 2, 8, io.StringIO(results.getvalue()))
+    >>> in_memory = ELECTIONS.Jurisdiction('Canada')
+    >>> in_memory.read_results(2000, 2, 8, io.StringIO(results.getvalue()))
+    >>> j.party_history('party 0') == in_memory.party_history('party 0')
+    True
+    >>> j._elections[date(2000, 2, 8)].party_seats() == \\
+    ...     in_memory._elections[date(2000, 2, 8)].party_seats()
+    True
+    >>> folder.cleanup()
+    """
+    _folder: str
+    _shards: int
+    _max_pending: int
+
+    def __init__(self, name: str, folder: str, shards: int = 16,
+                 max_pending: int = 100000) -> None:
+        """Initialize this jurisdiction, with no elections so far, keeping
+        the results of each election in <shards> files in a subfolder of
+        <folder> and holding at most <max_pending> tallies in memory per
+        election.
+        """
+        ELECTIONS.Jurisdiction.__init__(self, name)
+        self._folder = folder
+        self._shards = shards
+        self._max_pending = max_pending
+
+    def _new_election(self, d: date) -> ShardedElection:
+        """Return a new election on date <d> with no results, to be recorded
+        in this jurisdiction.
+        """
+        return ShardedElection(d, os.path.join(self._folder, d.isoformat()),
+                               self._shards, self._max_pending)
+
+
+class SQLiteJurisdiction(ELECTIONS.Jurisdiction):
+    """A Jurisdiction whose elections are stored in an SQLite database.
+
+    Opening a database that already holds results gives a jurisdiction with
+    those elections.
+
+    === Private Attributes ===
+    _connection: the connection to the database holding the results.
+
+    === Sample Usage ===
+    >>> import os, tempfile
+    >>> folder = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(folder.name, 'canada.db')
+    >>> j = SQLiteJurisdiction('Canada', path)
+    >>> e = j._new_election(date(2000, 2, 8))
+    >>> j._elections[date(2000, 2, 8)] = e
+    >>> e.update_results('r1', 'ndp', 1)
+    >>> e.update_results('r1', 'lib', 3)
+    >>> j.close()
+    >>> reopened = SQLiteJurisdiction('Canada', path)
+    >>> reopened.party_history('lib')
+    {datetime.date(2000, 2, 8): 0.75}
+    >>> reopened.party_history('lib') == reopened.party_history('lib')
+    True
+    >>> reopened.cache_info()
+    {'hits': 2, 'misses': 1}
+    >>> in_memory = ELECTIONS.Election(date(2004, 5, 16))
+    >>> in_memory.update_results('r1', 'lib', 2)
+    >>> reopened._elections[date(2004, 5, 16)] = in_memory
+    >>> reopened.party_history('lib') == {date(2000, 2, 8): 0.75,
+    ...                                   date(2004, 5, 16): 1.0}
+    True
+    >>> reopened.close()
+    >>> folder.cleanup()
+    """
+    _connection: sqlite3.Connection
+
+    def __init__(self, name: str, path: str) -> None:
+        """Initialize this jurisdiction with the elections in the SQLite
+        database at <path>, which is created if it does not exist.
+        """
+        ELECTIONS.Jurisdiction.__init__(self, name)
+        self._connection = sqlite3.connect(path)
+        _create_results_table(self._connection)
+        rows = self._connection.execute(
+            'SELECT DISTINCT election FROM results ORDER BY election')
+        for row in rows.fetchall():
+            d = date.fromisoformat(row[0])
+            self._elections[d] = self._new_election(d)
+
+    def close(self) -> None:
+        """Close the connection to this jurisdiction's database.
+        """
+        self._connection.close()
+
+    def _new_election(self, d: date) -> SQLiteElection:
+        """Return a new election on date <d> with no results, to be recorded
+        in this jurisdiction.
+        """
+        return SQLiteElection(d, self._connection)
+
+    def _party_shares(self, party: str) -> Dict[date, float]:
+        """Return party_history(<party>), computed without the cache.
+
+        The shares in every election stored in the database are found with a
+        single query.  Any other election added to _elections is asked for
+        its popular vote instead.
+        """
+        rows = self._connection.execute(
+            'SELECT election, '
+            'SUM(CASE WHEN party = ? THEN votes ELSE 0 END) * 1.0 / SUM(votes) '
+            'FROM results GROUP BY election', (party,))
+        stored = {date.fromisoformat(key): share for key, share in rows}
+        shares = {}
+        for d, election in self._elections.items():
+            if isinstance(election, SQLiteElection) and d in stored:
+                shares[d] = stored[d]
+            else:
+                votes = election.popular_vote()
+                if len(votes) > 0:
+                    shares[d] = votes.get(party, 0) / sum(votes.values())
+        return shares
+
+
+class LazyJurisdiction(ELECTIONS.Jurisdiction):
+    """A Jurisdiction whose elections are LazyElections, which read the
+    results of each riding from their csv files only when needed.
+
+    Only read_results_files reads lazily.  read_results is given a stream,
+    which cannot be read again later, so it keeps the results of the stream
+    in memory, just as an Election would.
+
+    === Private Attributes ===
+    _cache_size: the most ridings whose results each election keeps in
+        memory at once.
+
+    === Sample Usage ===
+    >>> import os, tempfile
+    >>> from election_benchmark import write_synthetic_results
+    >>> folder = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(folder.name, 'results.csv')
+    >>> with open(path, 'w') as output:
+    ...     write_synthetic_results(output, 10, 3, 200)
+    >>> j = LazyJurisdiction('Canada', cache_size=4)
+    >>> j.read_results_files(2000, 2, 8, [path])
+    >>> e = j._elections[date(2000, 2, 8)]
+    >>> e.riding_winners('riding 0') == e.riding_winners('riding 0')
+    True
+    >>> list(e._loaded)
+    ['riding 0']
+    >>> len(e._extra)
+    0
+    >>> with open(path) as input_stream:
+    ...     j.read_results(2000, 2, 8, input_stream)
+    >>> len(e._extra)
+    10
+    >>> folder.cleanup()
+    """
+    _cache_size: int
+
+    def __init__(self, name: str, cache_size: int = 64) -> None:
+        """Initialize this jurisdiction, with no elections so far, whose
+        elections keep the results of at most <cache_size> ridings in memory.
+        """
+        ELECTIONS.Jurisdiction.__init__(self, name)
+        self._cache_size = cache_size
+
+    def _new_election(self, d: date) -> LazyElection:
+        """Return a new election on date <d> with no results, to be recorded
+        in this jurisdiction.
+        """
+        return LazyElection(d, self._cache_size)
+
+    def read_results_files(self, year: int, month: int, day: int,
+                           paths: List[str]) -> None:
+        """Record results from every csv file in <paths> for an election in
+        this jurisdiction, by indexing where each riding's rows are.
+
+        The files are indexed in this process, one after another.
+
+        Precondition: each path in <paths> names a csv file, in the format
+        defined in the A0 handout, with one row per line.
+        """
+        self._history_cache.clear()
+        new_date = date(year, month, day)
+        if new_date not in self._elections:
+            self._elections[new_date] = self._new_election(new_date)
+        for path in paths:
+            self._elections[new_date].add_file(path)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-io': ['ShardedElection._spill', 'ShardedElection._compact',
+                       'ShardedElection._visit_shard',
+                       'ShardedElection._riding_results',
+                       'LazyElection.add_file', 'LazyElection._riding_results'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'datetime', 'typing', 'csv', 'os',
+            'sqlite3', 'zlib', 'array', 'collections', 'importlib',
+            'contextlib', 'heapq', 'itertools'
+        ],
+        'max-attributes': 15
+    })
+
+    import doctest
+
+    doctest.testmod()